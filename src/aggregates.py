@@ -0,0 +1,42 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+# Mergeable per-city partial aggregates (SUM, COUNT, MIN, MAX per column),
+# shared by the partitioned and process-parallel query paths.
+
+
+def partial_select(columns):
+    """
+    Returns the SELECT list computing SUM/COUNT/MIN/MAX for each column.
+    """
+    return ", ".join(f"SUM({c}), COUNT({c}), MIN({c}), MAX({c})" for c in columns)
+
+
+def merge_partials(rows, columns, merged=None):
+    """
+    Merges (key, sum, count, min, max, ...) rows produced by partial_select
+    into {key: {column: [sum, count, min, max]}}. Rows for the same key may
+    come from different partitions or workers.
+    """
+    if merged is None:
+        merged = {}
+    for row in rows:
+        stats = merged.setdefault(row[0], {c: [0.0, 0, None, None] for c in columns})
+        for i, col in enumerate(columns):
+            s, n, lo, hi = row[1 + 4 * i: 5 + 4 * i]
+            if not n:
+                continue
+            acc = stats[col]
+            acc[0] += s
+            acc[1] += n
+            acc[2] = lo if acc[2] is None else min(acc[2], lo)
+            acc[3] = hi if acc[3] is None else max(acc[3], hi)
+    return merged
+
+
+def mean(stat):
+    """
+    Mean from a merged (sum, count, min, max) entry, or None if it is empty.
+    """
+    return stat[0] / stat[1] if stat[1] else None
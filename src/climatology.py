@@ -0,0 +1,204 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+import math
+from datetime import date, timedelta
+
+from src.db_utils import iter_query
+from src.distribution import MEASURES, exact_quantile
+
+# Day-of-year climatology normals per city, keyed on the calendar day
+# ("MM-DD") so leap years need no special handling. Each normal pools every
+# year's values within +/- WINDOW_DAYS of that calendar day.
+
+WINDOW_DAYS = 7
+BAND = (0.1, 0.9)
+
+# 2000 is a leap year, so it has a slot for every MM-DD including 02-29.
+_SLOTS = [(date(2000, 1, 1) + timedelta(days=i)).strftime("%m-%d") for i in range(366)]
+_SLOT_INDEX = {md: i for i, md in enumerate(_SLOTS)}
+
+
+def ensure_climatology_table(connection):
+    """
+    Creates the climatology_normals table. Safe to run multiple times.
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS climatology_normals (
+            city_id INTEGER NOT NULL,
+            month_day TEXT NOT NULL,
+            measure TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            mean REAL,
+            std REAL,
+            p_low REAL,
+            p_high REAL,
+            PRIMARY KEY (city_id, measure, month_day)
+        );
+    """)
+    connection.commit()
+
+
+def _slots_for_range(date_from, date_to):
+    """
+    Returns the set of MM-DD slots whose window covers any date in the range.
+    """
+    start, end = date.fromisoformat(date_from), date.fromisoformat(date_to)
+    if (end - start).days >= 365:
+        return set(_SLOTS)
+
+    slots = set()
+    day = start
+    while day <= end:
+        centre = _SLOT_INDEX[day.strftime("%m-%d")]
+        for offset in range(-WINDOW_DAYS, WINDOW_DAYS + 1):
+            slots.add(_SLOTS[(centre + offset) % 366])
+        day += timedelta(days=1)
+    return slots
+
+
+def _normals_for_city(connection, city_id, slots):
+    """
+    Computes normal rows for one city and the requested MM-DD slots with a
+    single scan of the city's history.
+    """
+    buckets = {m: [[] for _ in _SLOTS] for m in MEASURES}
+    query = f"""
+    SELECT substr(date, 6, 5) AS month_day, {", ".join(MEASURES)}
+    FROM daily_weather_entries
+    WHERE city_id = ?;
+    """
+    for row in iter_query(connection, query, (city_id,), tuples=True):
+        idx = _SLOT_INDEX.get(row[0])
+        if idx is None:
+            continue
+        for i, measure in enumerate(MEASURES, start=1):
+            if row[i] is not None:
+                buckets[measure][idx].append(row[i])
+
+    results = []
+    for measure in MEASURES:
+        for md in slots:
+            centre = _SLOT_INDEX[md]
+            values = sorted(
+                v
+                for offset in range(-WINDOW_DAYS, WINDOW_DAYS + 1)
+                for v in buckets[measure][(centre + offset) % 366]
+            )
+            if not values:
+                continue
+            n = len(values)
+            mean = math.fsum(values) / n
+            std = math.sqrt(math.fsum((v - mean) ** 2 for v in values) / (n - 1)) if n > 1 else None
+            results.append((
+                city_id, md, measure, n, mean, std,
+                exact_quantile(values, BAND[0]), exact_quantile(values, BAND[1]),
+            ))
+    return results
+
+
+def refresh_climatology(connection, city_id=None, date_from=None, date_to=None):
+    """
+    Rebuilds climatology normals. With no arguments every city and slot is
+    rebuilt; with a city and range only the slots whose window touches the
+    range are recomputed. Returns the number of normal rows written.
+    """
+    ensure_climatology_table(connection)
+
+    if city_id is None:
+        city_ids = [row[0] for row in connection.execute(
+            "SELECT DISTINCT city_id FROM daily_weather_entries;"
+        )]
+    else:
+        city_ids = [city_id]
+
+    if date_from is None or date_to is None:
+        slots = set(_SLOTS)
+    else:
+        slots = _slots_for_range(date_from, date_to)
+
+    written = 0
+    for cid in city_ids:
+        rows = _normals_for_city(connection, cid, slots)
+        connection.executemany(
+            "INSERT OR REPLACE INTO climatology_normals "
+            "(city_id, month_day, measure, n, mean, std, p_low, p_high) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+            rows
+        )
+        written += len(rows)
+
+    connection.commit()
+    return written
+
+
+def refresh_if_present(connection, city_id, date_from, date_to):
+    """
+    Incrementally refreshes normals after new data, but only when the
+    climatology table has already been built. Used by phase3.
+    """
+    exists = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'climatology_normals';"
+    ).fetchone()
+    if exists is None:
+        return 0
+    return refresh_climatology(connection, city_id, date_from, date_to)
+
+
+def anomalies(connection, city_id, date_from, date_to, measure="mean_temp"):
+    """
+    Returns [(date, value, normal_mean, normal_std, z_score, outside_band), ...]
+    for each day of a city in the range, joined against the stored normals.
+    z_score is None when the normal has no spread.
+    """
+    if measure not in MEASURES:
+        raise ValueError(f"Unsupported measure: {measure}")
+
+    query = f"""
+    SELECT
+        d.date AS date,
+        d.{measure} AS value,
+        n.mean AS normal_mean,
+        n.std AS normal_std,
+        (d.{measure} - n.mean) / NULLIF(n.std, 0) AS z_score,
+        (d.{measure} < n.p_low OR d.{measure} > n.p_high) AS outside_band
+    FROM daily_weather_entries d
+    JOIN climatology_normals n
+      ON n.city_id = d.city_id
+     AND n.measure = ?
+     AND n.month_day = substr(d.date, 6, 5)
+    WHERE d.city_id = ?
+      AND d.date >= ?
+      AND d.date <= ?
+    ORDER BY d.date;
+    """
+    return connection.execute(query, (measure, city_id, date_from, date_to)).fetchall()
+
+
+def print_anomalies(connection, city_id, date_from, date_to, measure="mean_temp", z_threshold=2.0):
+    """
+    Prints the mean anomaly of a city over a range and lists extreme days
+    (|z| >= z_threshold). Output is displayed to 2 decimal places.
+    """
+    rows = anomalies(connection, city_id, date_from, date_to, measure)
+    if not rows:
+        print(f"No {measure} anomalies available for city_id={city_id} between {date_from} and {date_to}.")
+        return
+
+    deltas = [r["value"] - r["normal_mean"] for r in rows if r["value"] is not None]
+    z_scores = [r["z_score"] for r in rows if r["z_score"] is not None]
+    mean_delta = sum(deltas) / len(deltas) if deltas else 0.0
+    mean_z = sum(z_scores) / len(z_scores) if z_scores else 0.0
+
+    print(
+        f"{measure} anomaly (city_id={city_id}, {date_from} to {date_to}): "
+        f"{mean_delta:+.2f} vs normal, mean z-score {mean_z:+.2f}"
+    )
+
+    extremes = [r for r in rows if r["z_score"] is not None and abs(r["z_score"]) >= z_threshold]
+    for r in extremes:
+        print(
+            f" - {r['date']}: {r['value']:.2f} (normal {r['normal_mean']:.2f} "
+            f"± {r['normal_std']:.2f}, z={r['z_score']:+.2f})"
+        )
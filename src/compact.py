@@ -0,0 +1,259 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import date
+
+# Optional compact storage layout for daily weather rows.
+# daily_weather_compact is a WITHOUT ROWID table keyed on (city_id, day_number)
+# where day_number counts days since 1970-01-01 and every measure is stored
+# as an integer in tenths (26.4 -> 264). A daily_weather_entries view exposes
+# the old column names (except the surrogate id) so phase1/phase2 SQL and
+# phase3 inserts keep working against a migrated database.
+
+SCALE = 10
+
+COMPACT_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS daily_weather_compact (
+    city_id INTEGER NOT NULL,
+    day_number INTEGER NOT NULL,
+    min_temp INTEGER NOT NULL,
+    max_temp INTEGER NOT NULL,
+    mean_temp INTEGER,
+    precipitation INTEGER,
+    PRIMARY KEY (city_id, day_number)
+) WITHOUT ROWID;
+"""
+
+COMPAT_VIEW_SQL = f"""
+CREATE VIEW IF NOT EXISTS daily_weather_entries AS
+SELECT
+    date(day_number * 86400, 'unixepoch') AS date,
+    min_temp / {SCALE}.0 AS min_temp,
+    max_temp / {SCALE}.0 AS max_temp,
+    mean_temp / {SCALE}.0 AS mean_temp,
+    precipitation / {SCALE}.0 AS precipitation,
+    city_id AS city_id
+FROM daily_weather_compact;
+"""
+
+COMPAT_INSERT_TRIGGER_SQL = f"""
+CREATE TRIGGER IF NOT EXISTS daily_weather_entries_insert
+INSTEAD OF INSERT ON daily_weather_entries
+BEGIN
+    INSERT OR IGNORE INTO daily_weather_compact
+        (city_id, day_number, min_temp, max_temp, mean_temp, precipitation)
+    VALUES (
+        NEW.city_id,
+        CAST(julianday(NEW.date) - 2440587.5 AS INTEGER),
+        CAST(round(NEW.min_temp * {SCALE}) AS INTEGER),
+        CAST(round(NEW.max_temp * {SCALE}) AS INTEGER),
+        CAST(round(NEW.mean_temp * {SCALE}) AS INTEGER),
+        CAST(round(NEW.precipitation * {SCALE}) AS INTEGER)
+    );
+END;
+"""
+
+_MEASURES = ("min_temp", "max_temp", "mean_temp", "precipitation")
+
+# Derived data that migrate_to_compact does not copy; rebuild it on the
+# compact database with the function that created it.
+DERIVED_TABLES = {
+    "distribution_sketches": "distribution.build_monthly_sketches",
+    "climatology_normals": "climatology.refresh_climatology",
+    "city_rtree": "spatial.ensure_city_spatial_index",
+}
+
+
+def is_compact(connection):
+    """
+    True when daily_weather_entries is the compact compatibility view.
+    """
+    row = connection.execute(
+        "SELECT type FROM sqlite_master WHERE name = 'daily_weather_entries';"
+    ).fetchone()
+    return row is not None and row[0] == "view"
+
+
+def day_number(date_text):
+    """
+    Converts 'YYYY-MM-DD' to days since 1970-01-01.
+    """
+    return (date.fromisoformat(date_text) - date(1970, 1, 1)).days
+
+
+def _check_lossless(connection):
+    """
+    Raises ValueError if any measure is not exactly representable in tenths
+    or any date is not a canonical YYYY-MM-DD value.
+    """
+    checks = " OR ".join(
+        f"({m} IS NOT NULL AND round({m} * {SCALE}) / {SCALE}.0 != {m})" for m in _MEASURES
+    )
+    bad = connection.execute(
+        f"SELECT COUNT(*) FROM src.daily_weather_entries "
+        f"WHERE {checks} OR date(date) IS NOT date;"
+    ).fetchone()[0]
+    if bad:
+        raise ValueError(
+            f"{bad} rows cannot be stored losslessly at 1/{SCALE} resolution; migration aborted."
+        )
+
+
+def migrate_to_compact(src_path, dest_path):
+    """
+    Writes a compact copy of the database at src_path to dest_path.
+    countries and cities are copied unchanged; daily rows go into
+    daily_weather_compact behind the compatibility view. The copy is verified
+    row-for-row against the source before it is kept. DERIVED_TABLES are not
+    copied. Returns the row count.
+    """
+    if not os.path.exists(src_path):
+        raise FileNotFoundError(f"Database file not found: {src_path}")
+    if os.path.exists(dest_path):
+        raise FileExistsError(f"Destination already exists: {dest_path}")
+
+    conn = sqlite3.connect(dest_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src;", (src_path,))
+        _check_lossless(conn)
+
+        # Tables before their indexes. Triggers are skipped: the city_rtree
+        # sync triggers on cities reference a table that is not copied.
+        ddl = conn.execute(
+            "SELECT type, name, sql FROM src.sqlite_master "
+            "WHERE tbl_name IN ('countries', 'cities') AND sql IS NOT NULL "
+            "AND type IN ('table', 'index') "
+            "ORDER BY type = 'index', name;"
+        ).fetchall()
+        for _, _, sql in ddl:
+            conn.execute(sql)
+        for table in ("countries", "cities"):
+            conn.execute(f"INSERT INTO main.{table} SELECT * FROM src.{table};")
+        conn.execute(
+            "INSERT INTO main.sqlite_sequence (name, seq) "
+            "SELECT name, seq FROM src.sqlite_sequence WHERE name IN ('countries', 'cities');"
+        )
+
+        conn.execute(COMPACT_TABLE_SQL)
+        conn.execute(f"""
+            INSERT INTO daily_weather_compact
+                (city_id, day_number, min_temp, max_temp, mean_temp, precipitation)
+            SELECT
+                city_id,
+                CAST(julianday(date) - 2440587.5 AS INTEGER),
+                CAST(round(min_temp * {SCALE}) AS INTEGER),
+                CAST(round(max_temp * {SCALE}) AS INTEGER),
+                CAST(round(mean_temp * {SCALE}) AS INTEGER),
+                CAST(round(precipitation * {SCALE}) AS INTEGER)
+            FROM src.daily_weather_entries
+            ORDER BY city_id, date;
+        """)
+        conn.execute(COMPAT_VIEW_SQL)
+        conn.execute(COMPAT_INSERT_TRIGGER_SQL)
+        conn.commit()
+
+        columns = "date, min_temp, max_temp, mean_temp, precipitation, city_id"
+        mismatched = conn.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT {columns} FROM src.daily_weather_entries
+                EXCEPT
+                SELECT {columns} FROM main.daily_weather_entries
+            );
+        """).fetchone()[0]
+        counts = conn.execute(
+            "SELECT (SELECT COUNT(*) FROM src.daily_weather_entries), "
+            "(SELECT COUNT(*) FROM main.daily_weather_compact);"
+        ).fetchone()
+        if mismatched or counts[0] != counts[1]:
+            raise RuntimeError(
+                f"Compact copy does not match source ({mismatched} differing rows, "
+                f"{counts[0]} source vs {counts[1]} compact); migration aborted."
+            )
+
+        conn.execute("DETACH DATABASE src;")
+        conn.execute("VACUUM;")
+    except Exception:
+        conn.close()
+        os.remove(dest_path)
+        raise
+
+    conn.close()
+    return counts[1]
+
+
+def skipped_derived_tables(src_path):
+    """
+    Returns the DERIVED_TABLES present in src_path, which a migration leaves behind.
+    """
+    conn = sqlite3.connect(src_path)
+    try:
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table';")}
+    finally:
+        conn.close()
+    return [table for table in DERIVED_TABLES if table in names]
+
+
+def _time_query(path, sql, repeat=5):
+    conn = sqlite3.connect(path)
+    try:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+    finally:
+        conn.close()
+
+
+def benchmark(src_path, dest_path):
+    """
+    Prints file size and full-scan aggregate timings for the original and
+    compact layouts (best of 5 runs).
+    """
+    scans = [
+        ("original table",
+         src_path,
+         "SELECT city_id, AVG(mean_temp), SUM(precipitation) FROM daily_weather_entries "
+         "WHERE date >= '2010-01-01' AND date <= '2019-12-31' GROUP BY city_id;"),
+        ("compact table",
+         dest_path,
+         f"SELECT city_id, AVG(mean_temp) / {SCALE}.0, SUM(precipitation) / {SCALE}.0 "
+         f"FROM daily_weather_compact WHERE day_number >= {day_number('2010-01-01')} "
+         f"AND day_number <= {day_number('2019-12-31')} GROUP BY city_id;"),
+        ("compact via view",
+         dest_path,
+         "SELECT city_id, AVG(mean_temp), SUM(precipitation) FROM daily_weather_entries "
+         "WHERE date >= '2010-01-01' AND date <= '2019-12-31' GROUP BY city_id;"),
+    ]
+
+    src_size, dest_size = os.path.getsize(src_path), os.path.getsize(dest_path)
+    print(f"Size: original {src_size / 1e6:.2f} MB, compact {dest_size / 1e6:.2f} MB "
+          f"({100 * (1 - dest_size / src_size):.1f}% smaller)")
+    for label, path, sql in scans:
+        print(f"Scan ({label}): {_time_query(path, sql) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate a weather database to the compact layout.")
+    parser.add_argument("src", help="existing database")
+    parser.add_argument("dest", help="compact database to create")
+    parser.add_argument("--benchmark", action="store_true", help="print size and scan timings")
+    args = parser.parse_args()
+
+    rows = migrate_to_compact(args.src, args.dest)
+    print(f"Migrated {rows} daily rows to {args.dest}")
+    for table in skipped_derived_tables(args.src):
+        print(f"Not copied: {table} (rebuild with {DERIVED_TABLES[table]})")
+    if args.benchmark:
+        benchmark(args.src, args.dest)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,11 @@ from __future__ import annotations
 
 import os
 import sqlite3
-from typing import Tuple, Any, List
+from pathlib import Path
+from typing import Tuple, Any, List, Iterator
+
+
+DEFAULT_ARRAYSIZE = 1000
 
 
 def get_connection(db_path: str) -> sqlite3.Connection:
@@ -22,6 +26,15 @@ def get_connection(db_path: str) -> sqlite3.Connection:
     return conn
 
 
+def read_only_uri(db_path: str) -> str:
+    """
+    Build a read-only SQLite URI for a file path. The path is percent-encoded,
+    so names containing '?', '#' or '%' still open the right file.
+    Connect with sqlite3.connect(uri, uri=True).
+    """
+    return Path(db_path).resolve().as_uri() + "?mode=ro"
+
+
 def run_query(conn: sqlite3.Connection, sql: str, params: Tuple[Any, ...] = ()) -> List[sqlite3.Row]:
     """
     Execute a SELECT query and return all rows.
@@ -46,3 +59,30 @@ def run_execute(conn: sqlite3.Connection, sql: str, params: Tuple[Any, ...] = ()
     except sqlite3.Error as e:
         conn.rollback()
         raise RuntimeError(f"Database write failed: {e}\nSQL: {sql}\nParams: {params}") from e
+
+
+def iter_query(conn: sqlite3.Connection, sql: str, params: Tuple[Any, ...] = (),
+               arraysize: int = DEFAULT_ARRAYSIZE, tuples: bool = False) -> Iterator[Any]:
+    """
+    Execute a SELECT query and yield rows one at a time, fetching them in
+    batches of `arraysize` so memory stays bounded by the batch, not the result.
+    With tuples=True rows are plain tuples instead of sqlite3.Row, which is
+    cheaper on hot paths that index columns by position.
+    """
+    cur = None
+    try:
+        cur = conn.cursor()
+        if tuples:
+            cur.row_factory = None
+        cur.arraysize = arraysize
+        cur.execute(sql, params)
+        while True:
+            batch = cur.fetchmany()
+            if not batch:
+                break
+            yield from batch
+    except sqlite3.Error as e:
+        raise RuntimeError(f"Database query failed: {e}\nSQL: {sql}\nParams: {params}") from e
+    finally:
+        if cur is not None:
+            cur.close()
@@ -0,0 +1,379 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+import json
+import math
+from datetime import date, timedelta
+
+# Distribution statistics (median / percentiles) for daily measures.
+# Small ranges are answered exactly from the rows; large ranges merge
+# t-digest sketches stored per city x month in distribution_sketches,
+# so only the partial months at either end of a range are rescanned.
+
+MEASURES = ("min_temp", "max_temp", "mean_temp", "precipitation")
+DEFAULT_QUANTILES = (0.5, 0.95)
+DEFAULT_DELTA = 200
+EXACT_MAX_DAYS = 366
+
+
+class TDigest:
+    """
+    Merging t-digest (k1 scale function). Mergeable and serialisable; gives
+    exact results while every centroid still holds a single value.
+    """
+
+    def __init__(self, delta=DEFAULT_DELTA):
+        self.delta = delta
+        self.centroids = []
+        self.buffer = []
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value, weight=1.0):
+        if value is None:
+            return
+        self.buffer.append((float(value), float(weight)))
+        self.total += weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.buffer) > 5 * self.delta:
+            self._compress()
+
+    def merge(self, other):
+        other._compress()
+        if not other.total:
+            return self
+        self.buffer.extend(other.centroids)
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _q_limit(self, q0):
+        angle = math.asin(max(-1.0, min(1.0, 2 * q0 - 1))) + 2 * math.pi / self.delta
+        return (1 + math.sin(min(math.pi / 2, angle))) / 2
+
+    def _compress(self):
+        if not self.buffer:
+            return
+        items = sorted(self.centroids + self.buffer)
+        self.buffer = []
+
+        merged = []
+        q0 = 0.0
+        q_limit = self._q_limit(q0)
+        mean, weight = items[0]
+        for m, w in items[1:]:
+            if q0 + (weight + w) / self.total <= q_limit:
+                weight += w
+                mean += (m - mean) * w / weight
+            else:
+                merged.append((mean, weight))
+                q0 += weight / self.total
+                q_limit = self._q_limit(q0)
+                mean, weight = m, w
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, q):
+        """
+        Estimates the q-quantile (0 <= q <= 1) using linear interpolation
+        between closest ranks, matching exact_quantile for unmerged data.
+        """
+        self._compress()
+        if not self.total:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+
+        target = q * (self.total - 1) + 0.5
+        points = [(0.5, self.min)]
+        cumulative = 0.0
+        for mean, weight in self.centroids:
+            points.append((cumulative + weight / 2, mean))
+            cumulative += weight
+        points.append((self.total - 0.5, self.max))
+
+        for (p0, v0), (p1, v1) in zip(points, points[1:]):
+            if target <= p1:
+                if p1 <= p0:
+                    return v1
+                return v0 + (v1 - v0) * (target - p0) / (p1 - p0)
+        return self.max
+
+    def to_json(self):
+        self._compress()
+        return json.dumps({
+            "delta": self.delta, "min": self.min, "max": self.max,
+            "centroids": [[m, w] for m, w in self.centroids],
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        digest = cls(data["delta"])
+        digest.centroids = [tuple(c) for c in data["centroids"]]
+        digest.total = sum(w for _, w in digest.centroids)
+        digest.min = data["min"]
+        digest.max = data["max"]
+        return digest
+
+
+def exact_quantile(sorted_values, q):
+    """
+    Exact quantile of an already sorted list (linear interpolation between
+    closest ranks, the same definition as numpy's default).
+    """
+    if not sorted_values:
+        return None
+    pos = q * (len(sorted_values) - 1)
+    lo = int(math.floor(pos))
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def _check_measure(measure):
+    if measure not in MEASURES:
+        raise ValueError(f"Unsupported measure: {measure}")
+
+
+def _values(connection, city_id, measure, date_from, date_to):
+    query = f"""
+    SELECT {measure}
+    FROM daily_weather_entries
+    WHERE city_id = ?
+      AND date >= ?
+      AND date <= ?
+      AND {measure} IS NOT NULL
+    ORDER BY {measure};
+    """
+    return [row[0] for row in connection.execute(query, (city_id, date_from, date_to))]
+
+
+def ensure_sketch_table(connection):
+    """
+    Creates the distribution_sketches table (city_id x month x measure). Safe to run multiple times.
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS distribution_sketches (
+            city_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            measure TEXT NOT NULL,
+            sketch TEXT NOT NULL,
+            PRIMARY KEY (city_id, month, measure)
+        );
+    """)
+    connection.commit()
+
+
+def build_monthly_sketches(connection, city_id=None, date_from=None, date_to=None,
+                           measures=MEASURES, delta=DEFAULT_DELTA):
+    """
+    Builds and stores a t-digest per city x month x measure with one scan of
+    daily_weather_entries. Optional filters restrict the city and range; use
+    month-aligned dates. Returns the number of sketches written.
+    """
+    ensure_sketch_table(connection)
+    for m in measures:
+        _check_measure(m)
+
+    query = f"""
+    SELECT city_id, substr(date, 1, 7) AS month, {", ".join(measures)}
+    FROM daily_weather_entries
+    WHERE 1 = 1
+    """
+    params = []
+    if city_id is not None:
+        query += " AND city_id = ?"
+        params.append(city_id)
+    if date_from is not None:
+        query += " AND date >= ?"
+        params.append(date_from)
+    if date_to is not None:
+        query += " AND date <= ?"
+        params.append(date_to)
+
+    digests = {}
+    for row in connection.execute(query, params):
+        for i, measure in enumerate(measures, start=2):
+            key = (row[0], row[1], measure)
+            if key not in digests:
+                digests[key] = TDigest(delta)
+            digests[key].add(row[i])
+
+    connection.executemany(
+        "INSERT OR REPLACE INTO distribution_sketches (city_id, month, measure, sketch) "
+        "VALUES (?, ?, ?, ?);",
+        [(cid, month, measure, d.to_json()) for (cid, month, measure), d in digests.items()]
+    )
+    connection.commit()
+    return len(digests)
+
+
+def invalidate_sketches(connection, city_id, date_from, date_to):
+    """
+    Deletes stored sketches for the months touched by [date_from, date_to];
+    they are rebuilt on the next quantiles() call. No-op if the table is absent.
+    """
+    exists = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'distribution_sketches';"
+    ).fetchone()
+    if exists is None:
+        return 0
+
+    cur = connection.execute(
+        "DELETE FROM distribution_sketches WHERE city_id = ? AND month >= ? AND month <= ?;",
+        (city_id, str(date_from)[:7], str(date_to)[:7])
+    )
+    connection.commit()
+    return cur.rowcount
+
+
+def _split_months(date_from, date_to):
+    """
+    Splits [date_from, date_to] into (partial_ranges, full_months).
+    """
+    start, end = date.fromisoformat(date_from), date.fromisoformat(date_to)
+    partial, full = [], []
+    day = start
+    while day <= end:
+        month_start = day.replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        month_end = next_month - timedelta(days=1)
+        if day == month_start and month_end <= end:
+            full.append(month_start.isoformat()[:7])
+        else:
+            partial.append((day.isoformat(), min(month_end, end).isoformat()))
+        day = next_month
+    return partial, full
+
+
+def _stored_sketches(connection, city_id, measure, first_month, last_month):
+    return {
+        row[0]: row[1] for row in connection.execute(
+            "SELECT month, sketch FROM distribution_sketches "
+            "WHERE city_id = ? AND measure = ? AND month >= ? AND month <= ?;",
+            (city_id, measure, first_month, last_month)
+        )
+    }
+
+
+def _city_month_span(connection, city_id):
+    """
+    Returns the (first, last) YYYY-MM months holding rows for a city, or None.
+    """
+    row = connection.execute(
+        "SELECT MIN(date), MAX(date) FROM daily_weather_entries WHERE city_id = ?;",
+        (city_id,)
+    ).fetchone()
+    return (row[0][:7], row[1][:7]) if row[0] is not None else None
+
+
+def _month_runs(months):
+    """
+    Groups sorted YYYY-MM months into (first, last) runs of consecutive months.
+    """
+    runs = []
+    previous = None
+    for month in months:
+        index = int(month[:4]) * 12 + int(month[5:7])
+        if previous is not None and index == previous + 1:
+            runs[-1][1] = month
+        else:
+            runs.append([month, month])
+        previous = index
+    return [tuple(run) for run in runs]
+
+
+def _build_missing_sketches(connection, city_id, missing, delta):
+    """
+    Builds sketches for exactly the missing months. Months that turn out to
+    have no rows get empty sketches so they are not rescanned on later calls.
+    """
+    for first, last in _month_runs(missing):
+        build_monthly_sketches(connection, city_id, f"{first}-01", f"{last}-31", delta=delta)
+
+    built = {
+        row[0] for row in connection.execute(
+            "SELECT DISTINCT month FROM distribution_sketches "
+            "WHERE city_id = ? AND month >= ? AND month <= ?;",
+            (city_id, missing[0], missing[-1])
+        )
+    }
+    empty = TDigest(delta).to_json()
+    connection.executemany(
+        "INSERT OR IGNORE INTO distribution_sketches (city_id, month, measure, sketch) "
+        "VALUES (?, ?, ?, ?);",
+        [(city_id, month, m, empty) for month in missing if month not in built for m in MEASURES]
+    )
+    connection.commit()
+
+
+def sketch_for_range(connection, city_id, measure, date_from, date_to, delta=DEFAULT_DELTA):
+    """
+    Returns a TDigest for a city's measure over a range by merging stored
+    monthly sketches (building any missing ones) plus the partial edge months.
+    Once every month in the range has a sketch the call does not write.
+    """
+    _check_measure(measure)
+    ensure_sketch_table(connection)
+    partial, full = _split_months(date_from, date_to)
+
+    digest = TDigest(delta)
+    for lo, hi in partial:
+        for value in _values(connection, city_id, measure, lo, hi):
+            digest.add(value)
+
+    if full:
+        # Months outside the city's data have nothing to sketch.
+        span = _city_month_span(connection, city_id)
+        full = [m for m in full if span is not None and span[0] <= m <= span[1]]
+
+    if full:
+        stored = _stored_sketches(connection, city_id, measure, full[0], full[-1])
+        missing = [m for m in full if m not in stored]
+        if missing:
+            _build_missing_sketches(connection, city_id, missing, delta)
+            stored = _stored_sketches(connection, city_id, measure, full[0], full[-1])
+
+        for month in full:
+            if month in stored:
+                digest.merge(TDigest.from_json(stored[month]))
+
+    return digest
+
+
+def quantiles(connection, city_id, measure, date_from, date_to, qs=DEFAULT_QUANTILES,
+              exact_max_days=EXACT_MAX_DAYS):
+    """
+    Returns {q: value} for a city's measure between date_from and date_to (inclusive).
+    Ranges up to exact_max_days are computed exactly; longer ranges use the
+    stored monthly sketches. Values are None when there is no data.
+    """
+    _check_measure(measure)
+    days = (date.fromisoformat(date_to) - date.fromisoformat(date_from)).days + 1
+
+    if days <= exact_max_days:
+        values = _values(connection, city_id, measure, date_from, date_to)
+        return {q: exact_quantile(values, q) for q in qs}
+
+    digest = sketch_for_range(connection, city_id, measure, date_from, date_to)
+    return {q: digest.quantile(q) for q in qs}
+
+
+def print_percentiles(connection, city_id, measure, date_from, date_to, qs=DEFAULT_QUANTILES):
+    """
+    Prints percentiles of a measure for a city within a date range.
+    Output is displayed to 2 decimal places.
+    """
+    result = quantiles(connection, city_id, measure, date_from, date_to, qs)
+    if all(v is None for v in result.values()):
+        print(f"No {measure} data found for city_id={city_id} between {date_from} and {date_to}.")
+        return
+
+    print(f"Percentiles of {measure} (city_id={city_id}, {date_from} to {date_to}):")
+    for q, value in result.items():
+        print(f" - p{q * 100:g}: {value:.2f}")
@@ -0,0 +1,156 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from src.synthetic_db import build_synthetic_db
+
+# Load test for src/service.py. Starts the service on a synthetic DB in a
+# separate process, drives it with keep-alive connections and reports
+# requests/sec and latency percentiles.
+
+
+async def _get(reader, writer, target):
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection.")
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    return int(status_line.split()[1]), body
+
+
+def request_mix(city_ids, years, seed=1):
+    """
+    Returns a list of JSON endpoint targets covering the phase1 analytics.
+    """
+    rng = random.Random(seed)
+    targets = []
+    for _ in range(200):
+        city_id, year = rng.choice(city_ids), rng.choice(years)
+        month = rng.randint(1, 12)
+        targets.extend([
+            f"/average-annual-temperature?city_id={city_id}&year={year}",
+            f"/average-seven-day-precipitation?city_id={city_id}&start_date={year}-{month:02d}-01",
+            f"/average-mean-temp-by-city?date_from={year}-{month:02d}-01&date_to={year}-{month:02d}-28",
+            f"/average-annual-precipitation-by-country?year={year}",
+            f"/wettest-city?year={year}",
+            f"/top-rainfall-days?city_id={city_id}&year={year}&limit=5",
+        ])
+    rng.shuffle(targets)
+    return targets
+
+
+async def _worker(host, port, targets, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status, _ = await _get(reader, writer, targets[i % len(targets)])
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, concurrency=32, duration=10.0):
+    """
+    Runs the load test and returns a dict of summary statistics.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    _, body = await _get(reader, writer, "/cities")
+    writer.close()
+    city_ids = [c["city_id"] for c in json.loads(body)]
+
+    targets = request_mix(city_ids, list(range(2020, 2025)))
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _worker(host, port, targets[i::concurrency] or targets, deadline, latencies, errors)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+    }
+
+
+async def _wait_for_port(host, port, timeout=15.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"Service did not start on {host}:{port}")
+            await asyncio.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the local HTTP query service.")
+    parser.add_argument("--db", default="./db/synthetic.db",
+                        help="database to serve; built synthetically if missing")
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        rows = build_synthetic_db(args.db, n_cities=args.cities, start_year=2020, end_year=2024)
+        print(f"Built synthetic DB {args.db} ({rows} rows)")
+
+    server = subprocess.Popen([
+        sys.executable, "-m", "src.service", "--db", args.db,
+        "--port", str(args.port), "--workers", str(args.workers),
+    ])
+    try:
+        asyncio.run(_wait_for_port("127.0.0.1", args.port))
+        stats = asyncio.run(run_load("127.0.0.1", args.port, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(
+        f"{stats['requests']} requests ({stats['errors']} errors) in {args.duration:.0f}s: "
+        f"{stats['requests_per_sec']:.1f} req/s, p50 {stats['p50_ms']:.2f} ms, "
+        f"p99 {stats['p99_ms']:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
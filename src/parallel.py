@@ -0,0 +1,161 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from src.aggregates import mean, merge_partials, partial_select
+from src.db_utils import read_only_uri
+
+# Process-parallel per-city aggregation for large databases.
+# The city_id space is split into contiguous ranges; each worker process
+# holds its own read-only connection and returns SUM/COUNT/MIN/MAX partials
+# for its range, which are merged in the parent. Per-city seeks rely on the
+# idx_weather_city_date index created by phase3.ensure_unique_index.
+# Cities tied on the sort value are listed by city_id.
+
+_worker_conn = None
+
+
+def _init_worker(db_uri):
+    global _worker_conn
+    _worker_conn = sqlite3.connect(db_uri, uri=True)
+
+
+def _aggregate_cities(task):
+    return _aggregate_on(_worker_conn, task)
+
+
+def _aggregate_on(conn, task):
+    city_ids, date_from, date_to, columns = task
+    # An IN list (not a city_id range) lets SQLite seek (city_id, date) per city.
+    sql = f"""
+    SELECT city_id, {partial_select(columns)}
+    FROM daily_weather_entries
+    WHERE city_id IN ({", ".join("?" for _ in city_ids)})
+      AND date >= ? AND date <= ?
+    GROUP BY city_id;
+    """
+    return conn.execute(sql, (*city_ids, date_from, date_to)).fetchall()
+
+
+def database_uri(connection):
+    """
+    Returns a read-only URI for the connection's main database file.
+    """
+    for row in connection.execute("PRAGMA database_list;"):
+        if row[1] == "main" and row[2]:
+            return read_only_uri(row[2])
+    raise ValueError("Parallel aggregation needs a file-backed database.")
+
+
+def city_ranges(city_ids, chunks):
+    """
+    Splits sorted city ids into at most `chunks` contiguous, near-equal slices.
+    """
+    if not city_ids:
+        return []
+    chunks = max(1, min(chunks, len(city_ids)))
+    size, extra = divmod(len(city_ids), chunks)
+    ranges, start = [], 0
+    for i in range(chunks):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(city_ids[start:end])
+        start = end
+    return ranges
+
+
+def parallel_city_stats(connection, date_from, date_to, columns, workers=None, chunks_per_worker=4):
+    """
+    Aggregates columns per city between date_from and date_to (inclusive)
+    across a process pool. Returns {city_id: {column: [sum, count, min, max]}}.
+    With workers=1 the ranges run in this process without a pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    city_ids = [row[0] for row in connection.execute("SELECT id FROM cities ORDER BY id;")]
+    tasks = [
+        (ids, date_from, date_to, tuple(columns))
+        for ids in city_ranges(city_ids, workers * chunks_per_worker)
+    ]
+
+    merged = {}
+    if workers == 1:
+        conn = sqlite3.connect(database_uri(connection), uri=True)
+        try:
+            for task in tasks:
+                merge_partials(_aggregate_on(conn, task), columns, merged)
+        finally:
+            conn.close()
+        return merged
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(database_uri(connection),)) as pool:
+        for rows in pool.map(_aggregate_cities, tasks):
+            merge_partials(rows, columns, merged)
+    return merged
+
+
+def _city_names(connection):
+    return {row[0]: row[1] for row in connection.execute("SELECT id, name FROM cities;")}
+
+
+def average_mean_temp_by_city(connection, date_from, date_to, workers=None):
+    """
+    Parallel equivalent of phase1.average_mean_temp_by_city (same output).
+    """
+    stats = parallel_city_stats(connection, date_from, date_to, ("mean_temp",), workers)
+    names = _city_names(connection)
+    results = sorted(
+        ((cid, names[cid], mean(s["mean_temp"])) for cid, s in stats.items() if s["mean_temp"][1]),
+        key=lambda r: (-r[2], r[0])
+    )
+
+    if not results:
+        print(f"No results found between {date_from} and {date_to}.")
+        return
+
+    print(f"Average mean temperature by city ({date_from} to {date_to}):")
+    for cid, name, avg in results:
+        print(f" - {name} (city_id={cid}): {avg:.2f}°C")
+
+
+def temperature_variability_by_city(connection, date_from, date_to, workers=None):
+    """
+    Parallel equivalent of phase1.temperature_variability_by_city (same output).
+    """
+    stats = parallel_city_stats(connection, date_from, date_to, ("max_temp", "min_temp"), workers)
+    names = _city_names(connection)
+    results = sorted(
+        ((cid, names[cid], s["max_temp"][3] - s["min_temp"][2])
+         for cid, s in stats.items() if s["max_temp"][1]),
+        key=lambda r: (-r[2], r[0])
+    )
+
+    if not results:
+        print(f"No temperature data found between {date_from} and {date_to}.")
+        return
+
+    print(f"Temperature variability by city ({date_from} to {date_to}):")
+    for cid, name, temp_range in results:
+        print(f" - {name} (city_id={cid}): {temp_range:.2f}°C range")
+
+
+def avg_temp_and_precip_by_city_name(connection, date_from, date_to, workers=None):
+    """
+    Returns [(city_name, avg_temp, avg_precip), ...] ordered by name, grouped
+    by city name like phase2.plot_scatter_avg_temp_vs_precip_by_city.
+    """
+    columns = ("mean_temp", "precipitation")
+    stats = parallel_city_stats(connection, date_from, date_to, columns, workers)
+    names = _city_names(connection)
+
+    by_name = merge_partials(
+        [(names[cid], *[v for c in columns for v in s[c]]) for cid, s in stats.items()],
+        columns
+    )
+    return [
+        (name, mean(s["mean_temp"]), mean(s["precipitation"]))
+        for name, s in sorted(by_name.items())
+    ]
@@ -0,0 +1,557 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+import heapq
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+from src.aggregates import mean, merge_partials, partial_select
+from src.db_utils import read_only_uri
+
+# Optional time-partitioned layout for daily_weather_entries.
+# countries/cities stay in the main ("catalog") database; daily rows live in
+# one SQLite file per year (weather_2023.db) or per decade (weather_2020s.db)
+# inside a partition directory, and are ATTACHed only when a query needs them.
+
+PARTITION_SCHEMES = ("year", "decade")
+
+PARTITION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {schema}.daily_weather_entries (
+    "id"	INTEGER NOT NULL,
+    "date"	TEXT NOT NULL,
+    "min_temp"	REAL NOT NULL,
+    "max_temp"	REAL NOT NULL,
+    "mean_temp"	REAL DEFAULT 0.0,
+    "precipitation"	REAL DEFAULT 0.0,
+    "city_id"	INTEGER NOT NULL,
+    PRIMARY KEY("id" AUTOINCREMENT)
+);
+"""
+
+PARTITION_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS {schema}.idx_weather_city_date
+ON daily_weather_entries(city_id, date);
+"""
+
+WEATHER_COLUMNS = "id, date, min_temp, max_temp, mean_temp, precipitation, city_id"
+
+
+def partition_key(date_text, scheme="year"):
+    """
+    Returns the partition key for a YYYY-MM-DD date: "2023" or "2020s".
+    """
+    if scheme not in PARTITION_SCHEMES:
+        raise ValueError(f"Unknown partition scheme: {scheme}")
+
+    year = int(str(date_text)[:4])
+    if scheme == "decade":
+        return f"{year - year % 10}s"
+    return str(year)
+
+
+def partition_keys_for_range(date_from, date_to, scheme="year"):
+    """
+    Returns every partition key that can hold dates in [date_from, date_to].
+    """
+    first, last = int(str(date_from)[:4]), int(str(date_to)[:4])
+    keys = []
+    for year in range(first, last + 1):
+        key = partition_key(f"{year}-01-01", scheme)
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+def partition_path(base_dir, key):
+    """
+    Returns the file path of a partition.
+    """
+    return Path(base_dir) / f"weather_{key}.db"
+
+
+def existing_partitions(base_dir, date_from, date_to, scheme="year"):
+    """
+    Returns [(key, path), ...] for partition files that exist and overlap the range.
+    Partitions outside the range are pruned without being opened.
+    """
+    found = []
+    for key in partition_keys_for_range(date_from, date_to, scheme):
+        path = partition_path(base_dir, key)
+        if path.exists():
+            found.append((key, path))
+    return found
+
+
+def _schema_name(key):
+    return f"p_{key}"
+
+
+def attach_partition(connection, base_dir, key, create=False):
+    """
+    ATTACHes a partition to the connection (if not already attached) and
+    returns its schema name. With create=True a missing partition file is
+    created with the daily_weather_entries schema.
+    """
+    schema = _schema_name(key)
+    attached = {row[1] for row in connection.execute("PRAGMA database_list;")}
+    if schema in attached:
+        return schema
+
+    path = partition_path(base_dir, key)
+    if not path.exists() and not create:
+        raise FileNotFoundError(f"Partition file not found: {path}")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection.execute("ATTACH DATABASE ? AS " + schema + ";", (str(path),))
+    if create:
+        connection.execute(PARTITION_TABLE_SQL.format(schema=schema))
+        connection.execute(PARTITION_INDEX_SQL.format(schema=schema))
+    return schema
+
+
+def detach_partitions(connection):
+    """
+    DETACHes every partition schema from the connection.
+    """
+    for row in connection.execute("PRAGMA database_list;").fetchall():
+        if row[1].startswith("p_"):
+            connection.execute(f"DETACH DATABASE {row[1]};")
+
+
+def _attached_schemas(connection):
+    return {row[1] for row in connection.execute("PRAGMA database_list;")}
+
+
+def _last_weather_id(connection, schemas):
+    """
+    Returns the highest daily row id in use. The catalog's sqlite_sequence
+    entry for daily_weather_entries is the shared id sequence for every
+    partition, so ids stay unique across files as they are in one table.
+    """
+    row = None
+    if _has_sequence(connection):
+        row = connection.execute(
+            "SELECT seq FROM main.sqlite_sequence WHERE name = 'daily_weather_entries';"
+        ).fetchone()
+    last = row[0] if row is not None else 0
+    for schema in schemas:
+        top = connection.execute(f"SELECT MAX(id) FROM {schema}.daily_weather_entries;").fetchone()[0]
+        last = max(last, top or 0)
+    return last
+
+
+def _has_sequence(connection):
+    # A compact catalog has no AUTOINCREMENT table and so no sqlite_sequence.
+    return connection.execute(
+        "SELECT 1 FROM main.sqlite_master WHERE name = 'sqlite_sequence';"
+    ).fetchone() is not None
+
+
+def _store_last_weather_id(connection, last):
+    if not _has_sequence(connection):
+        return
+    cur = connection.execute(
+        "UPDATE main.sqlite_sequence SET seq = ? WHERE name = 'daily_weather_entries';", (last,)
+    )
+    if cur.rowcount == 0:
+        connection.execute(
+            "INSERT INTO main.sqlite_sequence (name, seq) VALUES ('daily_weather_entries', ?);",
+            (last,)
+        )
+
+
+def insert_rows_partitioned(connection, base_dir, rows, scheme="year"):
+    """
+    Routes (date, min_temp, max_temp, mean_temp, precipitation, city_id) rows to
+    their partitions with INSERT OR IGNORE, taking ids from the catalog's shared
+    sequence. Returns the number of new rows.
+    Safe to call while use_partitions is active: only partitions attached here
+    are detached, and the view is rebuilt if a new partition file was created.
+    """
+    if not rows:
+        print("No daily data returned by API.")
+        return 0
+
+    by_key = {}
+    for row in rows:
+        by_key.setdefault(partition_key(row[0], scheme), []).append(row)
+
+    already_attached = _attached_schemas(connection)
+    created = [key for key in by_key if not partition_path(base_dir, key).exists()]
+    inserted = 0
+    try:
+        # ATTACH is not allowed inside a transaction, so attach every target first.
+        schemas = {key: attach_partition(connection, base_dir, key, create=True) for key in by_key}
+        last_id = _last_weather_id(connection, schemas.values())
+        for key, key_rows in by_key.items():
+            schema = schemas[key]
+            before = connection.total_changes
+            connection.executemany(
+                f"""
+                INSERT OR IGNORE INTO {schema}.daily_weather_entries
+                    (id, date, min_temp, max_temp, mean_temp, precipitation, city_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?);
+                """,
+                [(last_id + i + 1, *row) for i, row in enumerate(key_rows)]
+            )
+            last_id += len(key_rows)
+            inserted += connection.total_changes - before
+        _store_last_weather_id(connection, last_id)
+        connection.commit()
+    except sqlite3.Error:
+        connection.rollback()
+        raise
+    finally:
+        for schema in _attached_schemas(connection) - already_attached:
+            connection.execute(f"DETACH DATABASE {schema};")
+
+    view = _active_view(connection)
+    if view is not None and view[0] == str(base_dir) and view[3] == scheme and any(
+        key in partition_keys_for_range(view[1], view[2], scheme) for key in created
+    ):
+        use_partitions(connection, *view)
+
+    return inserted
+
+
+def migrate_to_partitions(connection, base_dir, scheme="year", move=False):
+    """
+    Copies daily_weather_entries from the connected database into partition
+    files, keeping row ids. Safe to re-run; existing rows are skipped.
+    With move=True each range is deleted from main once every row is verified
+    in its partition, and the catalog is VACUUMed. Without it main keeps a
+    copy that later partitioned inserts do not update.
+    Returns {key: rows_copied}.
+    """
+    row = connection.execute(
+        "SELECT MIN(date), MAX(date) FROM main.daily_weather_entries;"
+    ).fetchone()
+    if row[0] is None:
+        return {}
+
+    copied = {}
+    for key in partition_keys_for_range(row[0], row[1], scheme):
+        if scheme == "decade":
+            first = int(key[:-1])
+            date_from, date_to = f"{first}-01-01", f"{first + 9}-12-31"
+        else:
+            date_from, date_to = f"{key}-01-01", f"{key}-12-31"
+
+        schema = attach_partition(connection, base_dir, key, create=True)
+        before = connection.total_changes
+        connection.execute(
+            f"""
+            INSERT OR IGNORE INTO {schema}.daily_weather_entries ({WEATHER_COLUMNS})
+            SELECT {WEATHER_COLUMNS}
+            FROM main.daily_weather_entries
+            WHERE date >= ? AND date <= ?
+            ORDER BY city_id, date;
+            """,
+            (date_from, date_to)
+        )
+        copied[key] = connection.total_changes - before
+
+        if move:
+            missing = connection.execute(
+                f"""
+                SELECT COUNT(*)
+                FROM main.daily_weather_entries m
+                WHERE m.date >= ? AND m.date <= ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM {schema}.daily_weather_entries p
+                      WHERE p.city_id = m.city_id AND p.date = m.date
+                  );
+                """,
+                (date_from, date_to)
+            ).fetchone()[0]
+            if missing:
+                connection.rollback()
+                detach_partitions(connection)
+                raise RuntimeError(
+                    f"{missing} rows of partition {key} were not copied; main left unchanged."
+                )
+            connection.execute(
+                "DELETE FROM main.daily_weather_entries WHERE date >= ? AND date <= ?;",
+                (date_from, date_to)
+            )
+        connection.commit()
+        detach_partitions(connection)
+
+    if move:
+        connection.execute("VACUUM;")
+    return copied
+
+
+def use_partitions(connection, base_dir, date_from, date_to, scheme="year"):
+    """
+    ATTACHes the partitions overlapping [date_from, date_to] and shadows
+    daily_weather_entries with a TEMP view over them, so existing phase1/phase2
+    SQL runs unchanged on the partitioned layout. Call release_partitions after.
+    Returns the attached partition keys.
+    """
+    release_partitions(connection)
+
+    parts = existing_partitions(base_dir, date_from, date_to, scheme)
+    limit = connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(parts) > limit:
+        raise ValueError(
+            f"{len(parts)} partitions needed but SQLite allows {limit} attached; "
+            "narrow the date range or use the decade scheme."
+        )
+
+    selects = []
+    for key, _ in parts:
+        schema = attach_partition(connection, base_dir, key)
+        selects.append(f"SELECT {WEATHER_COLUMNS} FROM {schema}.daily_weather_entries")
+    if not selects:
+        selects.append(f"SELECT {WEATHER_COLUMNS} FROM main.daily_weather_entries WHERE 0")
+
+    connection.execute(
+        "CREATE TEMP VIEW daily_weather_entries AS " + " UNION ALL ".join(selects) + ";"
+    )
+    # Remember the view's arguments so insert_rows_partitioned can rebuild it.
+    connection.execute(
+        "CREATE TEMP TABLE partition_view_args (base_dir TEXT, date_from TEXT, date_to TEXT, scheme TEXT);"
+    )
+    connection.execute(
+        "INSERT INTO temp.partition_view_args VALUES (?, ?, ?, ?);",
+        (str(base_dir), str(date_from), str(date_to), scheme)
+    )
+    connection.commit()
+    return [key for key, _ in parts]
+
+
+def _active_view(connection):
+    """
+    Returns the (base_dir, date_from, date_to, scheme) of the active
+    use_partitions view, or None.
+    """
+    exists = connection.execute(
+        "SELECT 1 FROM sqlite_temp_master WHERE name = 'partition_view_args';"
+    ).fetchone()
+    if exists is None:
+        return None
+    row = connection.execute("SELECT * FROM temp.partition_view_args;").fetchone()
+    return tuple(row) if row is not None else None
+
+
+def release_partitions(connection):
+    """
+    Drops the shadowing TEMP view and DETACHes all partitions.
+    """
+    connection.execute("DROP VIEW IF EXISTS temp.daily_weather_entries;")
+    connection.execute("DROP TABLE IF EXISTS temp.partition_view_args;")
+    connection.commit()
+    detach_partitions(connection)
+
+
+# ---------------------------------------------------------------------------
+# Parallel fan-out
+# ---------------------------------------------------------------------------
+
+def _query_partition(path, sql, params):
+    conn = sqlite3.connect(read_only_uri(path), uri=True)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def fan_out(base_dir, date_from, date_to, sql, params=(), scheme="year", max_workers=None):
+    """
+    Runs sql against every partition overlapping the range in parallel (one
+    read-only connection per partition) and returns the concatenated rows.
+    """
+    parts = existing_partitions(base_dir, date_from, date_to, scheme)
+    if not parts:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(parts)) as pool:
+        results = pool.map(lambda p: _query_partition(p[1], sql, params), parts)
+        return [row for rows in results for row in rows]
+
+
+def city_partial_stats(base_dir, date_from, date_to, columns, city_id=None, scheme="year"):
+    """
+    Aggregates columns per city across partitions. Each partition returns
+    SUM/COUNT/MIN/MAX partials which are merged exactly.
+    Returns {city_id: {column: (sum, count, min, max)}}.
+    """
+    sql = f"""
+    SELECT city_id, {partial_select(columns)}
+    FROM daily_weather_entries
+    WHERE date >= ? AND date <= ?
+    """
+    params = [date_from, date_to]
+    if city_id is not None:
+        sql += " AND city_id = ?"
+        params.append(city_id)
+    sql += " GROUP BY city_id;"
+
+    merged = merge_partials(fan_out(base_dir, date_from, date_to, sql, tuple(params), scheme), columns)
+    return {cid: {c: tuple(v) for c, v in stats.items()} for cid, stats in merged.items()}
+
+
+def _city_names(connection):
+    return {row[0]: (row[1], row[2]) for row in connection.execute(
+        "SELECT c.id, c.name, c.country_id FROM cities c;"
+    )}
+
+
+# ---------------------------------------------------------------------------
+# Phase 1 aggregations over partitions (same output as src/phase1.py)
+# ---------------------------------------------------------------------------
+
+def average_annual_temperature(connection, base_dir, city_id, year, scheme="year"):
+    """
+    Partitioned equivalent of phase1.average_annual_temperature.
+    """
+    stats = city_partial_stats(base_dir, f"{year}-01-01", f"{year}-12-31",
+                               ("mean_temp",), city_id, scheme)
+    avg_temp = mean(stats[city_id]["mean_temp"]) if city_id in stats else None
+    if avg_temp is None:
+        print(f"No temperature data found for city_id={city_id} in year={year}.")
+        return
+
+    print(f"Average annual mean temperature (city_id={city_id}, year={year}): {avg_temp:.2f}°C")
+
+
+def average_seven_day_precipitation(connection, base_dir, city_id, start_date, scheme="year"):
+    """
+    Partitioned equivalent of phase1.average_seven_day_precipitation.
+    """
+    end_date = (date.fromisoformat(start_date) + timedelta(days=6)).isoformat()
+    stats = city_partial_stats(base_dir, start_date, end_date,
+                               ("precipitation",), city_id, scheme)
+    avg_precip = mean(stats[city_id]["precipitation"]) if city_id in stats else None
+    if avg_precip is None:
+        print(f"No precipitation data found for city_id={city_id} starting from {start_date}.")
+        return
+
+    print(
+        f"Average 7-day precipitation (city_id={city_id}, start_date={start_date}): "
+        f"{avg_precip:.2f} mm"
+    )
+
+
+def average_mean_temp_by_city(connection, base_dir, date_from, date_to, scheme="year"):
+    """
+    Partitioned equivalent of phase1.average_mean_temp_by_city.
+    """
+    stats = city_partial_stats(base_dir, date_from, date_to, ("mean_temp",), scheme=scheme)
+    names = _city_names(connection)
+    results = sorted(
+        ((cid, names[cid][0], mean(s["mean_temp"])) for cid, s in stats.items()
+         if cid in names and s["mean_temp"][1]),
+        key=lambda r: (-r[2], r[0])
+    )
+
+    if not results:
+        print(f"No results found between {date_from} and {date_to}.")
+        return
+
+    print(f"Average mean temperature by city ({date_from} to {date_to}):")
+    for cid, name, avg in results:
+        print(f" - {name} (city_id={cid}): {avg:.2f}°C")
+
+
+def average_annual_precipitation_by_country(connection, base_dir, year, scheme="year"):
+    """
+    Partitioned equivalent of phase1.average_annual_precipitation_by_country.
+    """
+    stats = city_partial_stats(base_dir, f"{year}-01-01", f"{year}-12-31",
+                               ("precipitation",), scheme=scheme)
+    names = _city_names(connection)
+    countries = {row[0]: row[1] for row in connection.execute("SELECT id, name FROM countries;")}
+
+    totals = {}
+    for cid, s in stats.items():
+        if cid not in names or names[cid][1] not in countries:
+            continue
+        acc = totals.setdefault(names[cid][1], [0.0, 0])
+        acc[0] += s["precipitation"][0]
+        acc[1] += s["precipitation"][1]
+
+    results = sorted(
+        ((co, countries[co], t[0] / t[1]) for co, t in totals.items() if t[1]),
+        key=lambda r: (-r[2], r[0])
+    )
+
+    if not results:
+        print(f"No precipitation data found for year={year}.")
+        return
+
+    print(f"Average daily precipitation by country (year={year}):")
+    for co, name, avg in results:
+        print(f" - {name} (country_id={co}): {avg:.2f} mm")
+
+
+def wettest_city_by_year(connection, base_dir, year, scheme="year"):
+    """
+    Partitioned equivalent of phase1.wettest_city_by_year.
+    """
+    stats = city_partial_stats(base_dir, f"{year}-01-01", f"{year}-12-31",
+                               ("precipitation",), scheme=scheme)
+    names = _city_names(connection)
+    candidates = [(s["precipitation"][0], cid) for cid, s in stats.items() if cid in names]
+
+    if not candidates:
+        print(f"No precipitation data found for year={year}.")
+        return
+
+    total, cid = max(candidates, key=lambda r: (r[0], -r[1]))
+    print(
+        f"Wettest city in {year}: {names[cid][0]} (city_id={cid}) "
+        f"with total precipitation {total:.2f} mm"
+    )
+
+
+def temperature_variability_by_city(connection, base_dir, date_from, date_to, scheme="year"):
+    """
+    Partitioned equivalent of phase1.temperature_variability_by_city.
+    """
+    stats = city_partial_stats(base_dir, date_from, date_to,
+                               ("max_temp", "min_temp"), scheme=scheme)
+    names = _city_names(connection)
+    results = sorted(
+        ((cid, names[cid][0], s["max_temp"][3] - s["min_temp"][2])
+         for cid, s in stats.items() if cid in names and s["max_temp"][1]),
+        key=lambda r: (-r[2], r[0])
+    )
+
+    if not results:
+        print(f"No temperature data found between {date_from} and {date_to}.")
+        return
+
+    print(f"Temperature variability by city ({date_from} to {date_to}):")
+    for cid, name, temp_range in results:
+        print(f" - {name} (city_id={cid}): {temp_range:.2f}°C range")
+
+
+def top_rainfall_days_for_city(connection, base_dir, city_id, year, limit=5, scheme="year"):
+    """
+    Partitioned equivalent of phase1.top_rainfall_days_for_city.
+    Each partition returns its own top `limit` days; the merge keeps the best.
+    """
+    sql = """
+    SELECT date, precipitation
+    FROM daily_weather_entries
+    WHERE city_id = ?
+      AND date >= ? AND date <= ?
+    ORDER BY precipitation DESC
+    LIMIT ?;
+    """
+    rows = fan_out(base_dir, f"{year}-01-01", f"{year}-12-31", sql,
+                   (city_id, f"{year}-01-01", f"{year}-12-31", int(limit)), scheme)
+    results = heapq.nlargest(int(limit), rows, key=lambda r: r[1])
+
+    if not results:
+        print(f"No rainfall data found for city_id={city_id} in year={year}.")
+        return
+
+    print(f"Top {limit} rainfall days for city_id={city_id} in {year}:")
+    for day, precip in results:
+        print(f" - {day}: {precip:.2f} mm")
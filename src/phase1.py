@@ -2,29 +2,62 @@
 # Student ID: S3573368
 # Date: 2025 - 01 - 06
 
+import csv
 import sqlite3
 
+from src.db_utils import DEFAULT_ARRAYSIZE, iter_query
+
 # Phase 1 - Starter
 # Note: Display all real/float numbers to 2 decimal places.
 
+COUNTRIES_QUERY = "SELECT id, name, timezone FROM countries ORDER BY name;"
+
+
+def fetch_all_countries(connection):
+    """
+    Returns all countries (id, name, timezone) ordered by name.
+    """
+    cursor = connection.cursor()
+    return cursor.execute(COUNTRIES_QUERY).fetchall()
+
+
 def select_all_countries(connection):
     """
     Selects all countries from the countries table and prints them.
     """
     try:
-        query = "SELECT id, name, timezone FROM countries ORDER BY name;"
-        cursor = connection.cursor()
-        results = cursor.execute(query)
-
-        for row in results:
+        for row in iter_query(connection, COUNTRIES_QUERY):
             print(
                 f"Country Id: {row['id']} -- "
                 f"Country Name: {row['name']} -- "
                 f"Timezone: {row['timezone']}"
             )
 
-    except sqlite3.OperationalError as ex:
-        print(ex)
+    # iter_query wraps SQLite errors in RuntimeError; print the original message
+    except (sqlite3.OperationalError, RuntimeError) as ex:
+        print(ex.__cause__ or ex)
+
+
+CITIES_QUERY = """
+SELECT
+    c.id AS city_id,
+    c.name AS city_name,
+    co.id AS country_id,
+    co.name AS country_name,
+    co.timezone AS timezone
+FROM cities c
+JOIN countries co ON c.country_id = co.id
+ORDER BY co.name, c.name;
+"""
+
+
+def fetch_all_cities(connection):
+    """
+    Returns all cities with their country and timezone as a list
+    (used by the HTTP service; select_all_cities streams instead).
+    """
+    cursor = connection.cursor()
+    return cursor.execute(CITIES_QUERY).fetchall()
 
 
 def select_all_cities(connection):
@@ -32,30 +65,16 @@ def select_all_cities(connection):
     Selects all cities and prints each city with its country and timezone.
     """
     try:
-        query = """
-        SELECT
-            c.id AS city_id,
-            c.name AS city_name,
-            co.id AS country_id,
-            co.name AS country_name,
-            co.timezone AS timezone
-        FROM cities c
-        JOIN countries co ON c.country_id = co.id
-        ORDER BY co.name, c.name;
-        """
-
-        cursor = connection.cursor()
-        results = cursor.execute(query)
-
-        for row in results:
+        for row in iter_query(connection, CITIES_QUERY):
             print(
                 f"City Id: {row['city_id']} -- City: {row['city_name']} | "
                 f"Country: {row['country_name']} (Id: {row['country_id']}) | "
                 f"Timezone: {row['timezone']}"
             )
 
-    except sqlite3.OperationalError as ex:
-        print(ex)
+    # iter_query wraps SQLite errors in RuntimeError; print the original message
+    except (sqlite3.OperationalError, RuntimeError) as ex:
+        print(ex.__cause__ or ex)
 
 '''
 Good
@@ -64,21 +83,28 @@ In additional to successfully completing *all* the "Satisfactory" queries,
 implement the queries that satisfy the each query requirements indicated by the name
 of the function and any parameters to achieve a potential mark in the range 60-69.
 '''
+def fetch_average_annual_temperature(connection, city_id, year):
+    """
+    Returns the row (avg_temp) with a city's average mean temperature in a year.
+    """
+    query = """
+    SELECT AVG(d.mean_temp) AS avg_temp
+    FROM daily_weather_entries d
+    WHERE d.city_id = ?
+      AND substr(d.date, 1, 4) = ?;
+    """
+
+    cursor = connection.cursor()
+    return cursor.execute(query, (city_id, str(year))).fetchone()
+
+
 def average_annual_temperature(connection, city_id, year):
     """
     Prints the average mean temperature for a given city in a given year.
     Output is displayed to 2 decimal places.
     """
     try:
-        query = """
-        SELECT AVG(d.mean_temp) AS avg_temp
-        FROM daily_weather_entries d
-        WHERE d.city_id = ?
-          AND substr(d.date, 1, 4) = ?;
-        """
-
-        cursor = connection.cursor()
-        row = cursor.execute(query, (city_id, str(year))).fetchone()
+        row = fetch_average_annual_temperature(connection, city_id, year)
 
         avg_temp = row["avg_temp"]
         if avg_temp is None:
@@ -91,6 +117,23 @@ def average_annual_temperature(connection, city_id, year):
         print(ex)
 
 
+def fetch_average_seven_day_precipitation(connection, city_id, start_date):
+    """
+    Returns the row (avg_precip) with a city's average precipitation over the
+    7 days starting at start_date.
+    """
+    query = """
+    SELECT AVG(d.precipitation) AS avg_precip
+    FROM daily_weather_entries d
+    WHERE d.city_id = ?
+      AND d.date >= ?
+      AND d.date < date(?, '+7 days');
+    """
+
+    cursor = connection.cursor()
+    return cursor.execute(query, (city_id, start_date, start_date)).fetchone()
+
+
 def average_seven_day_precipitation(connection, city_id, start_date):
     """
     Prints the average precipitation for a 7-day window starting from start_date (inclusive)
@@ -99,16 +142,7 @@ def average_seven_day_precipitation(connection, city_id, start_date):
     Output is displayed to 2 decimal places.
     """
     try:
-        query = """
-        SELECT AVG(d.precipitation) AS avg_precip
-        FROM daily_weather_entries d
-        WHERE d.city_id = ?
-          AND d.date >= ?
-          AND d.date < date(?, '+7 days');
-        """
-
-        cursor = connection.cursor()
-        row = cursor.execute(query, (city_id, start_date, start_date)).fetchone()
+        row = fetch_average_seven_day_precipitation(connection, city_id, start_date)
 
         avg_precip = row["avg_precip"]
         if avg_precip is None:
@@ -131,27 +165,34 @@ In additional to successfully completing *all* the "Satisfactory" and "Good" que
 implement the queries that satisfy the each query requirements indicated by the name
 of the function and any parameters to achieve a potential mark in the range 70-79.
 '''
+def fetch_average_mean_temp_by_city(connection, date_from, date_to):
+    """
+    Returns (city_id, city_name, avg_mean_temp) rows between date_from and date_to.
+    """
+    query = """
+    SELECT
+        c.id AS city_id,
+        c.name AS city_name,
+        AVG(d.mean_temp) AS avg_mean_temp
+    FROM daily_weather_entries d
+    JOIN cities c ON d.city_id = c.id
+    WHERE d.date >= ?
+      AND d.date <= ?
+    GROUP BY c.id, c.name
+    ORDER BY avg_mean_temp DESC;
+    """
+
+    cursor = connection.cursor()
+    return cursor.execute(query, (date_from, date_to)).fetchall()
+
+
 def average_mean_temp_by_city(connection, date_from, date_to):
     """
     Prints the average mean temperature per city between date_from and date_to (inclusive).
     Dates must be in YYYY-MM-DD format.
     """
     try:
-        query = """
-        SELECT
-            c.id AS city_id,
-            c.name AS city_name,
-            AVG(d.mean_temp) AS avg_mean_temp
-        FROM daily_weather_entries d
-        JOIN cities c ON d.city_id = c.id
-        WHERE d.date >= ?
-          AND d.date <= ?
-        GROUP BY c.id, c.name
-        ORDER BY avg_mean_temp DESC;
-        """
-
-        cursor = connection.cursor()
-        results = cursor.execute(query, (date_from, date_to)).fetchall()
+        results = fetch_average_mean_temp_by_city(connection, date_from, date_to)
 
         if not results:
             print(f"No results found between {date_from} and {date_to}.")
@@ -167,27 +208,34 @@ def average_mean_temp_by_city(connection, date_from, date_to):
     except sqlite3.OperationalError as ex:
         print(ex)
 
+def fetch_average_annual_precipitation_by_country(connection, year):
+    """
+    Returns (country_id, country_name, avg_precip) rows for a given year.
+    """
+    query = """
+    SELECT
+        co.id AS country_id,
+        co.name AS country_name,
+        AVG(d.precipitation) AS avg_precip
+    FROM daily_weather_entries d
+    JOIN cities c ON d.city_id = c.id
+    JOIN countries co ON c.country_id = co.id
+    WHERE substr(d.date, 1, 4) = ?
+    GROUP BY co.id, co.name
+    ORDER BY avg_precip DESC;
+    """
+
+    cursor = connection.cursor()
+    return cursor.execute(query, (str(year),)).fetchall()
+
+
 def average_annual_precipitation_by_country(connection, year):
     """
     Prints the average daily precipitation per country for a given year.
     Output displayed to 2 decimal places.
     """
     try:
-        query = """
-        SELECT
-            co.id AS country_id,
-            co.name AS country_name,
-            AVG(d.precipitation) AS avg_precip
-        FROM daily_weather_entries d
-        JOIN cities c ON d.city_id = c.id
-        JOIN countries co ON c.country_id = co.id
-        WHERE substr(d.date, 1, 4) = ?
-        GROUP BY co.id, co.name
-        ORDER BY avg_precip DESC;
-        """
-
-        cursor = connection.cursor()
-        results = cursor.execute(query, (str(year),)).fetchall()
+        results = fetch_average_annual_precipitation_by_country(connection, year)
 
         if not results:
             print(f"No precipitation data found for year={year}.")
@@ -211,26 +259,34 @@ To achieve 80+ you will identify several suitable queries of your own that go be
 basic requirements for this phase.
 '''
 
+def fetch_wettest_city_by_year(connection, year):
+    """
+    Returns the (city_id, city_name, total_precip) row of the wettest city in a year,
+    or None.
+    """
+    query = """
+    SELECT
+        c.id AS city_id,
+        c.name AS city_name,
+        SUM(d.precipitation) AS total_precip
+    FROM daily_weather_entries d
+    JOIN cities c ON d.city_id = c.id
+    WHERE substr(d.date, 1, 4) = ?
+    GROUP BY c.id, c.name
+    ORDER BY total_precip DESC
+    LIMIT 1;
+    """
+
+    cursor = connection.cursor()
+    return cursor.execute(query, (str(year),)).fetchone()
+
+
 def wettest_city_by_year(connection, year):
     """
     Prints the city with the highest total precipitation in a given year.
     """
     try:
-        query = """
-        SELECT
-            c.id AS city_id,
-            c.name AS city_name,
-            SUM(d.precipitation) AS total_precip
-        FROM daily_weather_entries d
-        JOIN cities c ON d.city_id = c.id
-        WHERE substr(d.date, 1, 4) = ?
-        GROUP BY c.id, c.name
-        ORDER BY total_precip DESC
-        LIMIT 1;
-        """
-
-        cursor = connection.cursor()
-        row = cursor.execute(query, (str(year),)).fetchone()
+        row = fetch_wettest_city_by_year(connection, year)
 
         if row is None:
             print(f"No precipitation data found for year={year}.")
@@ -244,27 +300,34 @@ def wettest_city_by_year(connection, year):
     except sqlite3.OperationalError as ex:
         print(ex)
 
+def fetch_temperature_variability_by_city(connection, date_from, date_to):
+    """
+    Returns (city_id, city_name, temp_range) rows within a date range.
+    """
+    query = """
+    SELECT
+        c.id AS city_id,
+        c.name AS city_name,
+        (MAX(d.max_temp) - MIN(d.min_temp)) AS temp_range
+    FROM daily_weather_entries d
+    JOIN cities c ON d.city_id = c.id
+    WHERE d.date >= ?
+      AND d.date <= ?
+    GROUP BY c.id, c.name
+    ORDER BY temp_range DESC;
+    """
+
+    cursor = connection.cursor()
+    return cursor.execute(query, (date_from, date_to)).fetchall()
+
+
 def temperature_variability_by_city(connection, date_from, date_to):
     """
     Prints temperature variability (max of max_temp - min of min_temp) per city
     within a date range. Higher values indicate more extreme temperature swings.
     """
     try:
-        query = """
-        SELECT
-            c.id AS city_id,
-            c.name AS city_name,
-            (MAX(d.max_temp) - MIN(d.min_temp)) AS temp_range
-        FROM daily_weather_entries d
-        JOIN cities c ON d.city_id = c.id
-        WHERE d.date >= ?
-          AND d.date <= ?
-        GROUP BY c.id, c.name
-        ORDER BY temp_range DESC;
-        """
-
-        cursor = connection.cursor()
-        results = cursor.execute(query, (date_from, date_to)).fetchall()
+        results = fetch_temperature_variability_by_city(connection, date_from, date_to)
 
         if not results:
             print(f"No temperature data found between {date_from} and {date_to}.")
@@ -280,24 +343,31 @@ def temperature_variability_by_city(connection, date_from, date_to):
     except sqlite3.OperationalError as ex:
         print(ex)
 
+def fetch_top_rainfall_days_for_city(connection, city_id, year, limit=5):
+    """
+    Returns the (date, precipitation) rows of a city's wettest days in a year.
+    """
+    query = """
+    SELECT
+        d.date AS date,
+        d.precipitation AS precipitation
+    FROM daily_weather_entries d
+    WHERE d.city_id = ?
+      AND substr(d.date, 1, 4) = ?
+    ORDER BY d.precipitation DESC
+    LIMIT ?;
+    """
+
+    cursor = connection.cursor()
+    return cursor.execute(query, (city_id, str(year), int(limit))).fetchall()
+
+
 def top_rainfall_days_for_city(connection, city_id, year, limit=5):
     """
     Prints the top rainfall days for a city in a given year.
     """
     try:
-        query = """
-        SELECT
-            d.date AS date,
-            d.precipitation AS precipitation
-        FROM daily_weather_entries d
-        WHERE d.city_id = ?
-          AND substr(d.date, 1, 4) = ?
-        ORDER BY d.precipitation DESC
-        LIMIT ?;
-        """
-
-        cursor = connection.cursor()
-        results = cursor.execute(query, (city_id, str(year), int(limit))).fetchall()
+        results = fetch_top_rainfall_days_for_city(connection, city_id, year, limit)
 
         if not results:
             print(f"No rainfall data found for city_id={city_id} in year={year}.")
@@ -311,6 +381,37 @@ def top_rainfall_days_for_city(connection, city_id, year, limit=5):
         print(ex)
 
 
+def dump_daily_series(connection, out, city_id=None, date_from=None, date_to=None,
+                      arraysize=DEFAULT_ARRAYSIZE):
+    """
+    Writes raw daily rows as CSV to the file object `out`, streaming them so
+    memory stays flat however many rows match. Returns the number of rows written.
+    """
+    query = """
+    SELECT date, city_id, min_temp, max_temp, mean_temp, precipitation
+    FROM daily_weather_entries
+    WHERE 1 = 1
+    """
+    params = []
+    if city_id is not None:
+        query += " AND city_id = ?"
+        params.append(city_id)
+    if date_from is not None:
+        query += " AND date >= ?"
+        params.append(date_from)
+    if date_to is not None:
+        query += " AND date <= ?"
+        params.append(date_to)
+    query += " ORDER BY city_id, date;"
+
+    writer = csv.writer(out)
+    writer.writerow(("date", "city_id", "min_temp", "max_temp", "mean_temp", "precipitation"))
+    written = 0
+    for row in iter_query(connection, query, tuple(params), arraysize, tuples=True):
+        writer.writerow(row)
+        written += 1
+    return written
+
 
 if __name__ == "__main__":
     # Create a SQLite3 connection and call the various functions
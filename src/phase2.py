@@ -2,9 +2,13 @@
 # Student ID: S3573368
 # Date: 2025 - 01 - 06
 
+from bisect import bisect_left
 from pathlib import Path
 import matplotlib.pyplot as plt
 
+from src import parallel
+from src.db_utils import iter_query
+
 def save_figure(fig, filename):
     """
     Saves a matplotlib figure into a 'charts' folder in the project root.
@@ -199,6 +203,13 @@ def plot_scatter_avg_temp_vs_precip_by_city(connection, date_from, date_to):
     precips = [r["avg_precip"] for r in rows]
     labels = [r["city_name"] for r in rows]
 
+    return scatter_temp_vs_precip_figure(labels, temps, precips, date_from, date_to)
+
+
+def scatter_temp_vs_precip_figure(labels, temps, precips, date_from, date_to):
+    """
+    Draws the avg temperature vs avg precipitation scatter from per-city values.
+    """
     fig = plt.figure()
     plt.scatter(temps, precips)
     plt.title(f"Avg Temperature vs Avg Precipitation by City ({date_from} to {date_to})")
@@ -246,3 +257,165 @@ def plot_total_precip_by_city(connection, date_from, date_to):
     plt.xticks(rotation=20)
     plt.tight_layout()
     return fig
+
+
+# ---------------------------------------------------------------------------
+# Batch / small-multiples charting
+# ---------------------------------------------------------------------------
+
+SERIES_COLUMNS = ("min_temp", "max_temp", "mean_temp", "precipitation")
+
+
+def load_city_series(connection, city_ids, date_from, date_to, columns=SERIES_COLUMNS):
+    """
+    Loads daily series for several cities with a single query.
+    Returns a columnar dict: {city_id: {"date": [...], <column>: [...], ...}}.
+    Cities with no rows in the range are still present with empty lists.
+    """
+    columns = tuple(columns)
+    for col in columns:
+        if col not in SERIES_COLUMNS:
+            raise ValueError(f"Unsupported series column: {col}")
+
+    city_ids = [int(c) for c in city_ids]
+    series = {cid: {"date": [], **{col: [] for col in columns}} for cid in city_ids}
+    if not city_ids:
+        return series
+
+    placeholders = ", ".join("?" for _ in city_ids)
+    query = f"""
+    SELECT city_id, date, {", ".join(columns)}
+    FROM daily_weather_entries
+    WHERE city_id IN ({placeholders})
+      AND date >= ?
+      AND date <= ?
+    ORDER BY city_id, date;
+    """
+
+    for row in iter_query(connection, query, (*city_ids, date_from, date_to), tuples=True):
+        data = series[row[0]]
+        data["date"].append(row[1])
+        for i, col in enumerate(columns, start=2):
+            data[col].append(row[i])
+
+    return series
+
+
+def _month_slice(data, year, month):
+    """
+    Returns (start, end) list indices of a YYYY-MM month inside a sorted date column.
+    """
+    prefix = f"{int(year)}-{int(month):02d}"
+    dates = data["date"]
+    return bisect_left(dates, prefix), bisect_left(dates, prefix + "-32")
+
+
+def _draw_min_max(ax, data, start, end, title, full_dates=False):
+    """
+    Draws a min/max temperature line pair for one city-month on an existing axes.
+    The x axis shows two-digit days, or the full dates with full_dates=True.
+    """
+    dates = data["date"][start:end]
+    labels = dates if full_dates else [d[8:10] for d in dates]
+    ax.plot(labels, data["min_temp"][start:end], label="Min Temp (°C)")
+    ax.plot(labels, data["max_temp"][start:end], label="Max Temp (°C)")
+    ax.set_title(title, fontsize=9)
+    if not dates:
+        ax.text(0.5, 0.5, "No data", ha="center", va="center", transform=ax.transAxes)
+
+
+def plot_min_max_small_multiples(connection, city_ids, year, months=range(1, 13)):
+    """
+    Small-multiples grid of daily min/max temperatures: one row per city,
+    one column per month. All data is loaded with a single query.
+    """
+    months = [int(m) for m in months]
+    if not city_ids or not months:
+        print("No cities or months requested.")
+        return None
+
+    date_from = f"{int(year)}-{min(months):02d}-01"
+    date_to = f"{int(year)}-{max(months):02d}-31"
+    series = load_city_series(connection, city_ids, date_from, date_to, ("min_temp", "max_temp"))
+
+    if not any(data["date"] for data in series.values()):
+        print(f"No data found for city_ids={list(city_ids)} in {year}.")
+        return None
+
+    fig, axes = plt.subplots(
+        len(series), len(months),
+        figsize=(2.2 * len(months), 1.8 * len(series)),
+        sharey=True, squeeze=False,
+    )
+
+    for r, (cid, data) in enumerate(series.items()):
+        for c, month in enumerate(months):
+            start, end = _month_slice(data, year, month)
+            _draw_min_max(axes[r][c], data, start, end, f"City {cid} {year}-{month:02d}")
+            axes[r][c].tick_params(labelsize=6)
+            axes[r][c].xaxis.set_major_locator(plt.MaxNLocator(4))
+
+    axes[0][0].legend(fontsize=6)
+    fig.suptitle(f"Daily Min/Max Temperature by City and Month ({year})")
+    fig.tight_layout()
+    return fig
+
+
+def save_min_max_per_city_month(connection, city_ids, year, months=range(1, 13)):
+    """
+    Saves one min/max temperature chart per city per month, drawn like
+    plot_daily_min_max_for_month (full dates, rotated ticks) and saved under the
+    same file names as main.py, but with one query and one reused figure.
+    Returns the number of charts saved.
+    """
+    months = [int(m) for m in months]
+    if not city_ids or not months:
+        return 0
+
+    date_from = f"{int(year)}-{min(months):02d}-01"
+    date_to = f"{int(year)}-{max(months):02d}-31"
+    series = load_city_series(connection, city_ids, date_from, date_to, ("min_temp", "max_temp"))
+
+    fig, ax = plt.subplots()
+    saved = 0
+    try:
+        for cid, data in series.items():
+            for month in months:
+                start, end = _month_slice(data, year, month)
+                if start == end:
+                    print(f"No data found for city_id={cid} in {year}-{month:02d}.")
+                    continue
+
+                ax.clear()
+                title = f"Daily Min/Max Temperature (City ID {cid}) - {year}-{month:02d}"
+                _draw_min_max(ax, data, start, end, title, full_dates=True)
+                ax.set_title(title)
+                ax.set_xlabel("Date")
+                ax.set_ylabel("Temperature (°C)")
+                ax.tick_params(axis="x", labelrotation=45)
+                ax.legend()
+                fig.tight_layout()
+                save_figure(fig, f"chart2_min_max_temp_city{cid}_{year}-{month:02d}")
+                saved += 1
+    finally:
+        plt.close(fig)
+
+    return saved
+
+
+def plot_scatter_avg_temp_vs_precip_by_city_parallel(connection, date_from, date_to, workers=None):
+    """
+    Same chart as plot_scatter_avg_temp_vs_precip_by_city, with the per-city
+    aggregation split across a process pool (see src/parallel.py).
+    """
+    rows = parallel.avg_temp_and_precip_by_city_name(connection, date_from, date_to, workers)
+
+    if not rows:
+        print(f"No data found between {date_from} and {date_to}.")
+        return None
+
+    labels = [r[0] for r in rows]
+    temps = [r[1] for r in rows]
+    precips = [r[2] for r in rows]
+
+    return scatter_temp_vs_precip_figure(labels, temps, precips, date_from, date_to)
@@ -2,9 +2,15 @@
 # Student ID: S3573368
 # Date: 2025 - 01 - 06
 
+import sqlite3
 import time
 import requests
 
+from src import climatology
+from src import compact
+from src import distribution
+from src import partitions
+
 
 BASE_URL = "https://archive-api.open-meteo.com/v1/archive"
 
@@ -86,7 +92,12 @@ def ensure_unique_index(connection):
     """
     Adds a unique index so the same (city_id, date) cannot be inserted twice.
     This is safe to run multiple times.
+    A compact database (see src/compact.py) already enforces this through its
+    primary key, so nothing is done there.
     """
+    if compact.is_compact(connection):
+        return
+
     cursor = connection.cursor()
     cursor.execute("""
         CREATE UNIQUE INDEX IF NOT EXISTS idx_weather_city_date
@@ -95,11 +106,11 @@ def ensure_unique_index(connection):
     connection.commit()
 
 
-def insert_daily_weather(connection, city_id, api_json):
+def daily_weather_rows(city_id, api_json):
     """
-    Inserts API daily results into daily_weather_entries.
-    Uses INSERT OR IGNORE so duplicates are skipped (when unique index exists).
-    Returns count inserted (best-effort).
+    Converts the API "daily" arrays into
+    (date, min_temp, max_temp, mean_temp, precipitation, city_id) tuples.
+    Returns an empty list when the API returned no days.
     """
     daily = api_json.get("daily", {})
     dates = daily.get("time", [])
@@ -108,13 +119,27 @@ def insert_daily_weather(connection, city_id, api_json):
     means = daily.get("temperature_2m_mean", [])
     precips = daily.get("precipitation_sum", [])
 
-    if not dates:
-        print("No daily data returned by API.")
-        return 0
-
     if not (len(dates) == len(mins) == len(maxs) == len(means) == len(precips)):
         raise ValueError("API daily arrays are not the same length.")
 
+    return [
+        (dates[i], mins[i], maxs[i], means[i], precips[i], city_id)
+        for i in range(len(dates))
+    ]
+
+
+def insert_daily_weather(connection, city_id, api_json):
+    """
+    Inserts API daily results into daily_weather_entries.
+    Uses INSERT OR IGNORE so duplicates are skipped (when unique index exists).
+    Returns count inserted (best-effort).
+    """
+    rows = daily_weather_rows(city_id, api_json)
+
+    if not rows:
+        print("No daily data returned by API.")
+        return 0
+
     insert_sql = """
     INSERT OR IGNORE INTO daily_weather_entries
         (date, min_temp, max_temp, mean_temp, precipitation, city_id)
@@ -122,34 +147,221 @@ def insert_daily_weather(connection, city_id, api_json):
     """
 
     cursor = connection.cursor()
-    inserted = 0
+    before = connection.total_changes
 
-    for i in range(len(dates)):
-        cursor.execute(
-            insert_sql,
-            (dates[i], mins[i], maxs[i], means[i], precips[i], city_id)
-        )
-        # rowcount is 1 when inserted, 0 when ignored
-        inserted += cursor.rowcount
+    for row in rows:
+        cursor.execute(insert_sql, row)
+
+    # total_changes also counts rows written through the compact view's
+    # INSTEAD OF trigger, where cursor.rowcount stays 0
+    inserted = connection.total_changes - before
 
     connection.commit()
     return inserted
 
 
-def update_city_weather_from_api(connection, city_id, start_date, end_date):
+MEASURE_COLUMNS = ("min_temp", "max_temp", "mean_temp", "precipitation")
+
+
+def ensure_revisions_table(connection):
+    """
+    Creates daily_weather_revisions, which keeps the previous and new values
+    of every row changed by upsert_daily_weather. Safe to run multiple times.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_weather_revisions (
+            id INTEGER PRIMARY KEY,
+            city_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            revised_at TEXT NOT NULL DEFAULT (datetime('now')),
+            old_min_temp REAL, new_min_temp REAL,
+            old_max_temp REAL, new_max_temp REAL,
+            old_mean_temp REAL, new_mean_temp REAL,
+            old_precipitation REAL, new_precipitation REAL
+        );
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_revisions_city_date
+        ON daily_weather_revisions(city_id, date);
+    """)
+    connection.commit()
+
+
+def upsert_daily_weather(connection, city_id, api_json):
+    """
+    Applies API daily results as revisions: rows are bulk-loaded into a TEMP
+    staging table, then one INSERT ... ON CONFLICT(city_id, date) DO UPDATE
+    inserts new days and updates only the days whose values changed.
+    Changed rows are logged in daily_weather_revisions.
+    Days without min_temp/max_temp (NOT NULL columns) are skipped, and a null
+    mean_temp/precipitation never overwrites a stored value: the API returns
+    nulls for days it has not finalised yet.
+    Returns {"inserted", "updated", "unchanged", "skipped", "date_from", "date_to"},
+    where the dates bound the rows actually written (None when nothing changed).
+    """
+    if compact.is_compact(connection):
+        raise ValueError("Upsert ingestion needs the standard daily_weather_entries table.")
+
+    rows = daily_weather_rows(city_id, api_json)
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0,
+              "date_from": None, "date_to": None}
+    if not rows:
+        print("No daily data returned by API.")
+        return counts
+
+    complete = [r for r in rows if r[1] is not None and r[2] is not None]
+    counts["skipped"] = len(rows) - len(complete)
+    rows = complete
+    if not rows:
+        return counts
+
+    ensure_unique_index(connection)
+    ensure_revisions_table(connection)
+
+    # A staged null means "no value yet", so it never counts as a change.
+    differs = " OR ".join(f"(s.{c} IS NOT NULL AND s.{c} IS NOT d.{c})" for c in MEASURE_COLUMNS)
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS staging_daily_weather (
+                date TEXT NOT NULL,
+                min_temp REAL,
+                max_temp REAL,
+                mean_temp REAL,
+                precipitation REAL,
+                city_id INTEGER NOT NULL,
+                PRIMARY KEY (city_id, date)
+            );
+        """)
+        cursor.execute("DELETE FROM staging_daily_weather;")
+        # Later duplicates of the same day in one payload win.
+        cursor.executemany(
+            "INSERT OR REPLACE INTO staging_daily_weather "
+            "(date, min_temp, max_temp, mean_temp, precipitation, city_id) "
+            "VALUES (?, ?, ?, ?, ?, ?);",
+            rows
+        )
+
+        row = cursor.execute(f"""
+            SELECT
+                SUM(d.id IS NULL),
+                SUM(d.id IS NOT NULL AND ({differs})),
+                SUM(d.id IS NOT NULL AND NOT ({differs})),
+                MIN(CASE WHEN d.id IS NULL OR {differs} THEN s.date END),
+                MAX(CASE WHEN d.id IS NULL OR {differs} THEN s.date END)
+            FROM staging_daily_weather s
+            LEFT JOIN daily_weather_entries d
+              ON d.city_id = s.city_id AND d.date = s.date;
+        """).fetchone()
+        counts.update(zip(("inserted", "updated", "unchanged", "date_from", "date_to"), row))
+
+        if counts["updated"]:
+            cursor.execute(f"""
+                INSERT INTO daily_weather_revisions (
+                    city_id, date,
+                    old_min_temp, new_min_temp, old_max_temp, new_max_temp,
+                    old_mean_temp, new_mean_temp, old_precipitation, new_precipitation
+                )
+                SELECT
+                    s.city_id, s.date,
+                    d.min_temp, COALESCE(s.min_temp, d.min_temp),
+                    d.max_temp, COALESCE(s.max_temp, d.max_temp),
+                    d.mean_temp, COALESCE(s.mean_temp, d.mean_temp),
+                    d.precipitation, COALESCE(s.precipitation, d.precipitation)
+                FROM staging_daily_weather s
+                JOIN daily_weather_entries d
+                  ON d.city_id = s.city_id AND d.date = s.date
+                WHERE {differs};
+            """)
+
+        changed = " OR ".join(
+            f"(excluded.{c} IS NOT NULL AND excluded.{c} IS NOT daily_weather_entries.{c})"
+            for c in MEASURE_COLUMNS
+        )
+        cursor.execute(f"""
+            INSERT INTO daily_weather_entries
+                (date, min_temp, max_temp, mean_temp, precipitation, city_id)
+            SELECT date, min_temp, max_temp, mean_temp, precipitation, city_id
+            FROM staging_daily_weather
+            WHERE true
+            ON CONFLICT(city_id, date) DO UPDATE SET
+                min_temp = COALESCE(excluded.min_temp, daily_weather_entries.min_temp),
+                max_temp = COALESCE(excluded.max_temp, daily_weather_entries.max_temp),
+                mean_temp = COALESCE(excluded.mean_temp, daily_weather_entries.mean_temp),
+                precipitation = COALESCE(excluded.precipitation, daily_weather_entries.precipitation)
+            WHERE {changed};
+        """)
+        cursor.execute("DELETE FROM staging_daily_weather;")
+        connection.commit()
+    except sqlite3.Error as e:
+        connection.rollback()
+        raise RuntimeError(f"Upsert of API data failed: {e}") from e
+
+    counts["inserted"] = counts["inserted"] or 0
+    counts["updated"] = counts["updated"] or 0
+    counts["unchanged"] = counts["unchanged"] or 0
+    return counts
+
+
+def invalidate_rollups(connection, city_id, date_from, date_to):
+    """
+    Drops or refreshes derived data (percentile sketches, climatology normals)
+    for a city's date range after its daily rows changed.
+    """
+    distribution.invalidate_sketches(connection, city_id, date_from, date_to)
+    climatology.refresh_if_present(connection, city_id, date_from, date_to)
+
+
+def update_city_weather_from_api(connection, city_id, start_date, end_date,
+                                 partition_dir=None, scheme="year", revise=False):
     """
     End-to-end Phase 3 operation:
     - Read city coordinates + timezone from DB
     - Fetch from Open-Meteo
     - Insert into SQLite safely (no duplicates)
+    When partition_dir is given, rows are routed to the per-year (or per-decade)
+    partition files instead of the single daily_weather_entries table; the
+    affected sketches are dropped but climatology normals are not refreshed.
+    With revise=True, existing days are updated when the API has revised them
+    (see upsert_daily_weather). Returns the number of new rows.
     """
-    ensure_unique_index(connection)
+    if revise and partition_dir is not None:
+        raise ValueError("revise=True is not supported with partitioned storage.")
+    if revise and compact.is_compact(connection):
+        raise ValueError("revise=True needs the standard daily_weather_entries table, not the compact layout.")
+    if partition_dir is None:
+        ensure_unique_index(connection)
 
     city_name, lat, lon, timezone = get_city_and_timezone(connection, city_id)
     print(f"Fetching API data for {city_name} (city_id={city_id}) [{lat}, {lon}] timezone={timezone}")
 
     api_json = fetch_daily_weather(lat, lon, start_date, end_date, timezone)
-    inserted = insert_daily_weather(connection, city_id, api_json)
+
+    if revise:
+        counts = upsert_daily_weather(connection, city_id, api_json)
+        if counts["date_from"] is not None:
+            invalidate_rollups(connection, city_id, counts["date_from"], counts["date_to"])
+        print(
+            f"Inserted {counts['inserted']}, updated {counts['updated']}, "
+            f"unchanged {counts['unchanged']}, skipped {counts['skipped']} incomplete "
+            f"rows in daily_weather_entries for {city_name}."
+        )
+        return counts["inserted"]
+
+    if partition_dir is None:
+        inserted = insert_daily_weather(connection, city_id, api_json)
+    else:
+        rows = daily_weather_rows(city_id, api_json)
+        inserted = partitions.insert_rows_partitioned(connection, partition_dir, rows, scheme)
+
+    if inserted and partition_dir is None:
+        invalidate_rollups(connection, city_id, start_date, end_date)
+    elif inserted:
+        # Normals and sketches are computed from main.daily_weather_entries,
+        # which does not hold partitioned rows, so only drop the stale sketches.
+        # Rebuild rollups with partitions.use_partitions active.
+        distribution.invalidate_sketches(connection, city_id, start_date, end_date)
 
     print(f"Inserted {inserted} new rows into daily_weather_entries for {city_name}.")
     return inserted
@@ -0,0 +1,279 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+import argparse
+import asyncio
+import io
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+
+from src import phase1
+from src import phase2
+from src.db_utils import read_only_uri
+
+# Local HTTP query service (stdlib asyncio only).
+# JSON endpoints wrap the phase1 fetch_* functions; /charts/*.png endpoints
+# render the phase2 charts. Queries run in a thread pool of read-only
+# connections, charts in a single thread (pyplot is not thread-safe), and
+# identical requests that are already in flight share one result.
+
+
+def _iso_date(value):
+    return date.fromisoformat(value).isoformat()
+
+
+def _int_range(low, high):
+    def convert(value):
+        number = int(value)
+        if not low <= number <= high:
+            raise ValueError(f"{number} is outside {low}..{high}")
+        return number
+    return convert
+
+
+# SQLite integers are signed 64-bit; larger ids overflow before reaching the query.
+_city_id = _int_range(1, 2 ** 63 - 1)
+_year = _int_range(1, 9999)
+_month = _int_range(1, 12)
+# A negative LIMIT means "no limit" to SQLite.
+_limit = _int_range(1, 1000)
+
+
+JSON_ENDPOINTS = {
+    "/countries": (phase1.fetch_all_countries, ()),
+    "/cities": (phase1.fetch_all_cities, ()),
+    "/average-annual-temperature": (
+        phase1.fetch_average_annual_temperature, (("city_id", _city_id), ("year", _year))),
+    "/average-seven-day-precipitation": (
+        phase1.fetch_average_seven_day_precipitation, (("city_id", _city_id), ("start_date", _iso_date))),
+    "/average-mean-temp-by-city": (
+        phase1.fetch_average_mean_temp_by_city, (("date_from", _iso_date), ("date_to", _iso_date))),
+    "/average-annual-precipitation-by-country": (
+        phase1.fetch_average_annual_precipitation_by_country, (("year", _year),)),
+    "/wettest-city": (phase1.fetch_wettest_city_by_year, (("year", _year),)),
+    "/temperature-variability": (
+        phase1.fetch_temperature_variability_by_city, (("date_from", _iso_date), ("date_to", _iso_date))),
+    "/top-rainfall-days": (
+        phase1.fetch_top_rainfall_days_for_city, (("city_id", _city_id), ("year", _year), ("limit", _limit, 5))),
+}
+
+CHART_ENDPOINTS = {
+    "/charts/seven-day-precipitation.png": (
+        phase2.plot_seven_day_precipitation, (("city_id", _city_id), ("start_date", _iso_date))),
+    "/charts/daily-min-max.png": (
+        phase2.plot_daily_min_max_for_month, (("city_id", _city_id), ("year", _year), ("month", _month))),
+    "/charts/avg-daily-precip-by-country.png": (
+        phase2.plot_avg_daily_precip_by_country, (("year", _year),)),
+    "/charts/grouped-temp-stats.png": (
+        phase2.plot_grouped_temp_stats_by_city, (("date_from", _iso_date), ("date_to", _iso_date))),
+    "/charts/scatter-temp-vs-precip.png": (
+        phase2.plot_scatter_avg_temp_vs_precip_by_city, (("date_from", _iso_date), ("date_to", _iso_date))),
+    "/charts/total-precip-by-city.png": (
+        phase2.plot_total_precip_by_city, (("date_from", _iso_date), ("date_to", _iso_date))),
+}
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_args(query, spec):
+    params = dict(parse_qsl(query))
+    args = []
+    for name, convert, *default in spec:
+        if name not in params:
+            if default:
+                args.append(default[0])
+                continue
+            raise HTTPError(400, f"Missing query parameter: {name}")
+        try:
+            args.append(convert(params[name]))
+        except ValueError:
+            raise HTTPError(400, f"Invalid value for {name}: {params[name]}")
+    return tuple(args)
+
+
+def _to_json(result):
+    if result is None:
+        return None
+    if isinstance(result, sqlite3.Row):
+        return dict(result)
+    return [dict(row) for row in result]
+
+
+class QueryService:
+    """
+    Runs analytics for the HTTP handler: one read-only SQLite connection per
+    worker thread, plus in-flight request coalescing.
+    """
+
+    def __init__(self, db_path, workers=4):
+        if not Path(db_path).exists():
+            raise FileNotFoundError(f"Database file not found: {db_path}")
+        self.db_uri = read_only_uri(db_path)
+        self._local = threading.local()
+        self._db_pool = ThreadPoolExecutor(workers, thread_name_prefix="db")
+        self._chart_pool = ThreadPoolExecutor(1, thread_name_prefix="chart")
+        self._inflight = {}
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_uri, uri=True)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _run_json(self, func, args):
+        return json.dumps(_to_json(func(self._connection(), *args))).encode()
+
+    def _run_chart(self, func, args):
+        fig = func(self._connection(), *args)
+        if fig is None:
+            return None
+        try:
+            buf = io.BytesIO()
+            fig.savefig(buf, format="png", dpi=100, bbox_inches="tight")
+            return buf.getvalue()
+        finally:
+            plt.close(fig)
+
+    async def _coalesced(self, key, pool, func, *args):
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(pool, func, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def dispatch(self, target):
+        """
+        Returns (status, content_type, body) for a GET request target.
+        """
+        url = urlsplit(target)
+        key = (url.path, tuple(sorted(parse_qsl(url.query))))
+
+        if url.path in JSON_ENDPOINTS:
+            func, spec = JSON_ENDPOINTS[url.path]
+            args = _parse_args(url.query, spec)
+            body = await self._coalesced(key, self._db_pool, self._run_json, func, args)
+            return 200, "application/json", body
+
+        if url.path in CHART_ENDPOINTS:
+            func, spec = CHART_ENDPOINTS[url.path]
+            args = _parse_args(url.query, spec)
+            body = await self._coalesced(key, self._chart_pool, self._run_chart, func, args)
+            if body is None:
+                raise HTTPError(404, "No data for the requested chart.")
+            return 200, "image/png", body
+
+        if url.path == "/":
+            routes = sorted(JSON_ENDPOINTS) + sorted(CHART_ENDPOINTS)
+            return 200, "application/json", json.dumps(routes).encode()
+
+        raise HTTPError(404, f"Unknown endpoint: {url.path}")
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode("latin-1").split()
+                version = parts[2] if len(parts) == 3 else "HTTP/1.0"
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    if version == "HTTP/1.1"
+                    else headers.get("connection", "").lower() == "keep-alive"
+                )
+
+                try:
+                    if len(parts) != 3:
+                        raise HTTPError(400, "Malformed request line.")
+                    if parts[0] != "GET":
+                        raise HTTPError(405, f"Method not allowed: {parts[0]}")
+                    status, content_type, body = await self.dispatch(parts[1])
+                except HTTPError as ex:
+                    status, content_type = ex.status, "application/json"
+                    body = json.dumps({"error": str(ex)}).encode()
+                except (sqlite3.Error, RuntimeError) as ex:
+                    status, content_type = 500, "application/json"
+                    body = json.dumps({"error": str(ex)}).encode()
+                except Exception as ex:
+                    # Anything unexpected still gets a response instead of a dropped connection.
+                    print(f"Unhandled error for {request_line.decode('latin-1').strip()}: {ex!r}")
+                    status, content_type = 500, "application/json"
+                    body = json.dumps({"error": "Internal server error."}).encode()
+
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self._db_pool.shutdown(wait=False)
+        self._chart_pool.shutdown(wait=False)
+
+
+async def serve(db_path, host="127.0.0.1", port=8080, workers=4):
+    service = QueryService(db_path, workers)
+    server = await asyncio.start_server(service.handle_client, host, port)
+    print(f"Serving {db_path} on http://{host}:{port}/ ({workers} DB workers)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP query service for the weather analytics.")
+    parser.add_argument("--db", default="./db/CIS4044-N-SDI-OPENMETEO-PARTIAL.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+import math
+
+from src import phase1
+from src.phase3 import parse_latlong
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180.0
+
+# latlong is stored as "<lat>,<long>" text; CAST ignores surrounding spaces.
+_LAT_SQL = "CAST(substr(NEW.latlong, 1, instr(NEW.latlong, ',') - 1) AS REAL)"
+_LON_SQL = "CAST(substr(NEW.latlong, instr(NEW.latlong, ',') + 1) AS REAL)"
+# Values without a comma would split into lat=0, lon=<whole string>; skip them.
+_HAS_LATLONG_SQL = "NEW.latlong IS NOT NULL AND instr(NEW.latlong, ',') > 0"
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in kilometres between two (lat, lon) points in degrees.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def ensure_city_spatial_index(connection):
+    """
+    Creates an R*Tree index over city coordinates (city_rtree) and triggers that
+    keep it in sync with the cities table. Safe to run multiple times; the index
+    and triggers are rebuilt each call. Cities whose latlong cannot be parsed
+    are left out of the index. Returns the number of cities skipped.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS city_rtree
+        USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+    """)
+    for trigger in ("city_rtree_ai", "city_rtree_au", "city_rtree_ad"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger};")
+
+    cursor.execute(f"""
+        CREATE TRIGGER city_rtree_ai
+        AFTER INSERT ON cities WHEN {_HAS_LATLONG_SQL}
+        BEGIN
+            INSERT OR REPLACE INTO city_rtree VALUES
+                (NEW.id, {_LAT_SQL}, {_LAT_SQL}, {_LON_SQL}, {_LON_SQL});
+        END;
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER city_rtree_au
+        AFTER UPDATE OF latlong ON cities
+        BEGIN
+            DELETE FROM city_rtree WHERE id = OLD.id;
+            INSERT INTO city_rtree
+            SELECT NEW.id, {_LAT_SQL}, {_LAT_SQL}, {_LON_SQL}, {_LON_SQL}
+            WHERE {_HAS_LATLONG_SQL};
+        END;
+    """)
+    cursor.execute("""
+        CREATE TRIGGER city_rtree_ad
+        AFTER DELETE ON cities
+        BEGIN
+            DELETE FROM city_rtree WHERE id = OLD.id;
+        END;
+    """)
+
+    cursor.execute("DELETE FROM city_rtree;")
+    rows = cursor.execute("SELECT id, latlong FROM cities WHERE latlong IS NOT NULL;").fetchall()
+    skipped = 0
+    for city_id, latlong in rows:
+        try:
+            lat, lon = parse_latlong(latlong)
+        except ValueError as ex:
+            print(f"Skipping city_id={city_id} in spatial index: {ex}")
+            skipped += 1
+            continue
+        cursor.execute(
+            "INSERT INTO city_rtree VALUES (?, ?, ?, ?, ?);",
+            (city_id, lat, lat, lon, lon)
+        )
+
+    connection.commit()
+    return skipped
+
+
+def _cities_in_boxes(connection, boxes):
+    """
+    Returns {city_id: (city_name, lat, lon)} for cities inside any of the given
+    (min_lat, max_lat, min_lon, max_lon) boxes. The R*Tree stores 32-bit floats,
+    so its answer is a superset; exact coordinates come from cities.latlong.
+    """
+    query = """
+    SELECT c.id AS city_id, c.name AS city_name, c.latlong AS latlong
+    FROM city_rtree r
+    JOIN cities c ON c.id = r.id
+    WHERE r.max_lat >= ? AND r.min_lat <= ?
+      AND r.max_lon >= ? AND r.min_lon <= ?;
+    """
+    cursor = connection.cursor()
+    found = {}
+    for min_lat, max_lat, min_lon, max_lon in boxes:
+        for row in cursor.execute(query, (min_lat, max_lat, min_lon, max_lon)):
+            try:
+                lat, lon = parse_latlong(row[2])
+            except ValueError:
+                # Indexed by the trigger but unparseable (e.g. "abc,def"); not a usable location.
+                continue
+            found[row[0]] = (row[1], lat, lon)
+    return found
+
+
+def _radius_boxes(lat, lon, radius_km):
+    """
+    Bounding boxes (split at the antimeridian) that cover every point within
+    radius_km of (lat, lon).
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        # Circle contains a pole: every longitude is in range.
+        return [(max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0)]
+
+    widest = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    dlon = dlat / widest
+    if dlon >= 180:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        return [(min_lat, max_lat, min_lon + 360, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def cities_in_bbox(connection, min_lat, min_lon, max_lat, max_lon):
+    """
+    Returns [(city_id, city_name, lat, lon), ...] for cities inside the box,
+    ordered by city_id. If min_lon > max_lon the box wraps the antimeridian.
+    """
+    if min_lon <= max_lon:
+        boxes = [(min_lat, max_lat, min_lon, max_lon)]
+    else:
+        boxes = [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+
+    found = _cities_in_boxes(connection, boxes)
+    wraps = min_lon > max_lon
+    results = []
+    for city_id, (name, lat, lon) in sorted(found.items()):
+        in_lon = (lon >= min_lon or lon <= max_lon) if wraps else (min_lon <= lon <= max_lon)
+        if min_lat <= lat <= max_lat and in_lon:
+            results.append((city_id, name, lat, lon))
+    return results
+
+
+def nearest_cities(connection, lat, lon, k=1, start_radius_km=50.0):
+    """
+    Returns the k nearest cities to (lat, lon) as
+    [(city_id, city_name, distance_km), ...], closest first.
+    The search box grows until it holds k candidates, then is widened once to
+    the k-th candidate's distance so no closer city outside the box is missed.
+    """
+    k = int(k)
+    if k <= 0:
+        return []
+
+    radius = float(start_radius_km)
+    while True:
+        found = _cities_in_boxes(connection, _radius_boxes(lat, lon, radius))
+        covers_globe = radius >= math.pi * EARTH_RADIUS_KM
+        if len(found) >= k or covers_globe:
+            break
+        radius *= 4
+
+    ranked = sorted(
+        (haversine_km(lat, lon, c_lat, c_lon), city_id, name)
+        for city_id, (name, c_lat, c_lon) in found.items()
+    )
+    if len(ranked) >= k and ranked[k - 1][0] > radius:
+        found = _cities_in_boxes(connection, _radius_boxes(lat, lon, ranked[k - 1][0]))
+        ranked = sorted(
+            (haversine_km(lat, lon, c_lat, c_lon), city_id, name)
+            for city_id, (name, c_lat, c_lon) in found.items()
+        )
+
+    return [(city_id, name, dist) for dist, city_id, name in ranked[:k]]
+
+
+def for_nearest_city(connection, lat, lon, func, *args, **kwargs):
+    """
+    Calls a city_id-based analytics function (e.g. phase1.average_annual_temperature)
+    for the city nearest to (lat, lon). Returns the function's result, or None
+    when no city is indexed.
+    """
+    nearest = nearest_cities(connection, lat, lon, k=1)
+    if not nearest:
+        print(f"No indexed city found near ({lat}, {lon}).")
+        return None
+
+    city_id, city_name, dist = nearest[0]
+    print(f"Nearest city to ({lat}, {lon}): {city_name} (city_id={city_id}), {dist:.2f} km away")
+    return func(connection, city_id, *args, **kwargs)
+
+
+def average_annual_temperature_near(connection, lat, lon, year):
+    """
+    Prints the average annual mean temperature for the city nearest to (lat, lon).
+    """
+    return for_nearest_city(connection, lat, lon, phase1.average_annual_temperature, year)
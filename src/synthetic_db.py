@@ -0,0 +1,121 @@
+# Author: GOODNESS ONONOGBU
+# Student ID: S3573368
+# Date: 2025 - 01 - 06
+
+import argparse
+import math
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+
+# Builds a synthetic database with the same schema as the coursework DB, for
+# load tests and benchmarks at sizes the bundled partial DB does not reach.
+
+SCHEMA_SQL = """
+CREATE TABLE "countries" (
+    "id"	INTEGER NOT NULL,
+    "name"	TEXT NOT NULL,
+    "timezone"	TEXT NOT NULL,
+    PRIMARY KEY("id" AUTOINCREMENT)
+);
+CREATE INDEX "countries_name_idx" ON "countries" ("name" ASC);
+CREATE INDEX "counties_tz_idx" ON "countries" ("timezone" ASC);
+CREATE TABLE "daily_weather_entries" (
+    "id"	INTEGER NOT NULL,
+    "date"	TEXT NOT NULL,
+    "min_temp"	REAL NOT NULL,
+    "max_temp"	REAL NOT NULL,
+    "mean_temp"	REAL DEFAULT 0.0,
+    "precipitation"	REAL DEFAULT 0.0,
+    "city_id"	INTEGER NOT NULL,
+    PRIMARY KEY("id" AUTOINCREMENT),
+    FOREIGN KEY("city_id") REFERENCES "cities"("id") ON DELETE SET NULL
+);
+CREATE TABLE "cities" (
+    "id"	INTEGER NOT NULL,
+    "name"	TEXT NOT NULL,
+    "country_id"	INTEGER NOT NULL,
+    "latlong"	TEXT,
+    PRIMARY KEY("id" AUTOINCREMENT),
+    FOREIGN KEY("country_id") REFERENCES "countries"("id") ON DELETE SET NULL
+);
+CREATE INDEX "cities_name_idx" ON "cities" ("name" ASC);
+"""
+
+TIMEZONES = ("Europe/London", "Europe/Berlin", "America/New_York", "Asia/Tokyo", "Australia/Sydney")
+
+
+def build_synthetic_db(path, n_cities=50, start_year=2000, end_year=2024, seed=42):
+    """
+    Creates a synthetic weather database at path (overwriting it) with
+    n_cities cities and one row per city per day between start_year and
+    end_year. Returns the number of daily rows written.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SCHEMA_SQL)
+
+        conn.executemany(
+            "INSERT INTO countries (name, timezone) VALUES (?, ?);",
+            [(f"Country {i + 1}", tz) for i, tz in enumerate(TIMEZONES)]
+        )
+
+        cities = []
+        for i in range(n_cities):
+            lat, lon = rng.uniform(-60, 70), rng.uniform(-180, 180)
+            cities.append((f"City {i + 1}", i % len(TIMEZONES) + 1, f"{lat:.5f},{lon:.5f}"))
+        conn.executemany("INSERT INTO cities (name, country_id, latlong) VALUES (?, ?, ?);", cities)
+
+        first, last = date(start_year, 1, 1), date(end_year, 12, 31)
+        days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        rows = 0
+        for city_id in range(1, n_cities + 1):
+            base = rng.uniform(-5, 28)
+            swing = rng.uniform(2, 15)
+            wetness = rng.uniform(0.2, 0.7)
+            batch = []
+            for day in days:
+                season = swing * math.sin(2 * math.pi * (day.timetuple().tm_yday - 100) / 365.25)
+                mean = round(base + season + rng.gauss(0, 2), 1)
+                spread = abs(rng.gauss(4, 1.5))
+                precip = round(rng.expovariate(0.25), 1) if rng.random() < wetness else 0.0
+                batch.append((day.isoformat(), round(mean - spread / 2, 1),
+                              round(mean + spread / 2, 1), mean, precip, city_id))
+            conn.executemany(
+                "INSERT INTO daily_weather_entries "
+                "(date, min_temp, max_temp, mean_temp, precipitation, city_id) "
+                "VALUES (?, ?, ?, ?, ?, ?);",
+                batch
+            )
+            rows += len(batch)
+
+        conn.execute(
+            "CREATE UNIQUE INDEX idx_weather_city_date ON daily_weather_entries(city_id, date);"
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a synthetic weather database.")
+    parser.add_argument("path", help="output .db file (overwritten)")
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--start-year", type=int, default=2000)
+    parser.add_argument("--end-year", type=int, default=2024)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = build_synthetic_db(args.path, args.cities, args.start_year, args.end_year, args.seed)
+    print(f"Wrote {rows} daily rows for {args.cities} cities to {args.path}")
+
+
+if __name__ == "__main__":
+    main()